@@ -0,0 +1,212 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from search import solve
+from problem import *
+from pattern_database import PatternDatabase
+from distance_table import load_distance_table
+
+"""solves a batch of independent instances on all the cores. The instances are read from a JSON lines file (one object
+per line) or a CSV file (one row per instance, with a header), each one has:
+    id         a name for the instance (the line number if it is missing)
+    problem    "missionaries", "peg" or "sliding" (any width x width puzzle, a 9 cell one is an Eight_PuzzleProblem)
+    initial    the initial state as a list of cells (in CSV the cells are separated by spaces)
+    goal       the goal in the same format
+    strategy   the number of the strategy of search.solve (1 to 10)
+and optionally max_nodes, max_time and max_stored_nodes (the budgets of this instance, see search.SearchEngine),
+people and capacity for missionaries and cannibals, width for peg solitaire.
+The instances are sent to a pool of worker processes in chunks, so that sending a task and its result costs little
+compared to solving it, and the results of a chunk are written to the output (JSON lines) when the whole chunk is done,
+in the order the chunks finish. The output is flushed after every chunk, so if the batch is stopped the chunks being
+solved are lost, and --resume skips the instances that already have a result in the output. When the instances have a
+time budget the default chunks are kept to about CHUNK_SECONDS of budget, so that little work can be lost.
+The pattern databases and the distance tables are files that are memory-mapped by each worker, so the workers share one
+copy of them in the page cache instead of each reading its own. The distance tables that strategy 9 needs are built
+before the workers start so that they do not all build the same one.
+Usage: python batch.py instances.jsonl results.jsonl [--workers 4] [--max-time 10] (see --help)"""
+
+FIELDS = ("max_nodes", "max_time", "max_stored_nodes", "people", "capacity", "width")
+CHUNK_SECONDS = 60  # the largest sum of the time budgets of the instances of a default chunk
+pattern_databases = list()  # the PatternDatabase opened by this worker, see init_worker
+
+
+def read_instances(path):
+    """returns the instances of a JSON lines or CSV file (chosen by the extension .csv) as a list of dictionaries"""
+    instances = list()
+    with open(path, newline="") as file:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(file):
+                instance = {"problem": row["problem"].strip(), "strategy": int(row["strategy"]),
+                            "initial": [int(cell) for cell in row["initial"].split()],
+                            "goal": [int(cell) for cell in row["goal"].split()]}
+                if row.get("id"):
+                    instance["id"] = row["id"].strip()
+                for field in FIELDS:
+                    if row.get(field, "").strip():
+                        instance[field] = float(row[field]) if field == "max_time" else int(row[field])
+                instances.append(instance)
+        else:
+            for line in file:
+                if line.strip():
+                    instances.append(json.loads(line))
+    for number, instance in enumerate(instances):
+        instance.setdefault("id", number + 1)
+    return instances
+
+
+def make_problem(instance):
+    """builds the problem class of an instance"""
+    kind = instance["problem"]
+    if kind == "missionaries":
+        return ProblemMissionaries(instance["initial"], instance["goal"], instance.get("people", 3),
+                                   instance.get("capacity", 2))
+    if kind == "peg":
+        return PegProblem(instance["initial"], instance["goal"], width=instance.get("width", 7))
+    if kind == "sliding":
+        databases = [database for database in pattern_databases if database.matches(instance["goal"])]
+        if len(instance["initial"]) == 9:
+            return Eight_PuzzleProblem(instance["initial"], instance["goal"], databases)
+        return SlidingPuzzleProblem(instance["initial"], instance["goal"], databases)
+    raise ValueError("unknown problem %r" % kind)
+
+
+def init_worker(paths):
+    """runs once in each worker: opens the pattern databases, which are used by every sliding puzzle whose goal is the
+    one they were built for (the other puzzles use the default heuristic)"""
+    global pattern_databases
+    pattern_databases = [PatternDatabase(path) for path in paths]
+
+
+def solve_instance(instance, max_nodes=None, max_time=None, max_stored_nodes=None):
+    """solves one instance and returns its result as a dictionary that can be written as JSON: the id, the status of
+    the search (or "error" with the error if the instance could not be built), the cost and moves of the solution and
+    the statistics of the search (and the bound of the anytime search). The budgets of the instance replace the ones
+    given here"""
+    record = {"id": instance.get("id"), "problem": instance.get("problem"), "strategy": instance.get("strategy")}
+    try:
+        problem = make_problem(instance)
+        result = solve(problem, instance["strategy"], instance.get("max_nodes", max_nodes),
+                       instance.get("max_time", max_time), instance.get("max_stored_nodes", max_stored_nodes))
+    except Exception as error:  # a bad instance must not stop the batch
+        record.update({"status": "error", "error": "%s: %s" % (type(error).__name__, error)})
+        return record
+    record.update({"status": result.status, "cost": None, "moves": None, "expanded": result.expanded,
+                   "loops": result.loops, "peak_frontier": result.peak_frontier,
+                   "wall_time": round(result.wall_time, 4)})
+    if result.bound is not None:
+        record["bound"] = result.bound
+    if result.node is not None:
+        record["cost"] = result.node.path_cost
+        record["moves"] = [problem.decode_action(node.action) for node in result.solution()[1:]]
+    return record
+
+
+def solve_chunk(arguments):
+    """solves a chunk of instances in a worker, arguments is (instances, max_nodes, max_time, max_stored_nodes)"""
+    instances, max_nodes, max_time, max_stored_nodes = arguments
+    return [solve_instance(instance, max_nodes, max_time, max_stored_nodes) for instance in instances]
+
+
+def finished_ids(path):
+    """returns the ids that already have a result in the output file. A last line that was only partly written when the
+    batch was stopped is cut off so that new results start on their own line"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as file:
+        data = file.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            file.truncate(end)
+    for line in data[:end].splitlines():
+        if line.strip():
+            done.add(json.loads(line)["id"])
+    return done
+
+
+def chunk_limit(instances, max_time):
+    """the number of instances whose time budgets fit in CHUNK_SECONDS, with the largest budget of the instances (their
+    own max_time or the default one). Without a time budget the chunks are not limited"""
+    budgets = [instance.get("max_time", max_time) for instance in instances]
+    if not budgets or None in budgets:
+        return 100
+    return int(CHUNK_SECONDS / max(max(budgets), 1e-9))
+
+
+def prepare_tables(instances):
+    """builds the distance tables of the 8-puzzle goals that strategy 9 needs, in this process"""
+    for goal in set(tuple(instance["goal"]) for instance in instances
+                    if instance.get("strategy") == 9 and instance.get("problem") == "sliding"):
+        if len(goal) == 9 and sorted(goal) == list(range(9)):
+            load_distance_table(list(goal))
+
+
+def run_batch(instances, output, workers=None, chunk_size=None, max_nodes=None, max_time=None, max_stored_nodes=None,
+              databases=(), resume=False):
+    """solves the instances with a pool of workers (os.cpu_count() by default) and appends one JSON line per instance
+    to the output file as the results come back. chunk_size is the number of instances sent to a worker at once, by
+    default the instances are cut in about 4 chunks per worker, at most 100 instances each, which keeps all the workers
+    busy until the end, and fewer if their time budgets add up to more than CHUNK_SECONDS (see chunk_limit). Returns
+    the number of instances of each status"""
+    workers = workers or os.cpu_count() or 1
+    if resume:
+        done = finished_ids(output)
+        instances = [instance for instance in instances if instance["id"] not in done]
+    if chunk_size is None:
+        chunk_size = max(1, min(100, int(len(instances) / (4 * workers)), chunk_limit(instances, max_time)))
+    prepare_tables(instances)
+    chunks = [(instances[i:i + chunk_size], max_nodes, max_time, max_stored_nodes)
+              for i in range(0, len(instances), chunk_size)]
+    counts = dict()
+    with open(output, "a" if resume else "w") as file:
+        if workers == 1:
+            init_worker(databases)
+            results = map(solve_chunk, chunks)
+            pool = None
+        else:
+            pool = Pool(workers, init_worker, (list(databases),))
+            results = pool.imap_unordered(solve_chunk, chunks)
+        try:
+            for records in results:
+                for record in records:
+                    file.write(json.dumps(record) + "\n")
+                    counts[record["status"]] = counts.get(record["status"], 0) + 1
+                file.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return counts
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="solves a batch of instances on all the cores")
+    parser.add_argument("instances", help="JSON lines or CSV file of instances")
+    parser.add_argument("output", help="JSON lines file the results are written to")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of cores)")
+    parser.add_argument("--chunk-size", type=int, help="number of instances sent to a worker at once")
+    parser.add_argument("--max-nodes", type=int, help="default budget of expanded nodes of each instance")
+    parser.add_argument("--max-time", type=float, help="default budget of seconds of each instance")
+    parser.add_argument("--max-stored-nodes", type=int, help="default budget of nodes kept in memory of each instance")
+    parser.add_argument("--pattern-databases", nargs="*", default=[], help="pattern database files for the puzzles")
+    parser.add_argument("--resume", action="store_true", help="skip the instances that already have a result")
+    options = parser.parse_args(arguments)
+    instances = read_instances(options.instances)
+    started = time.perf_counter()
+    counts = run_batch(instances, options.output, options.workers, options.chunk_size, options.max_nodes,
+                       options.max_time, options.max_stored_nodes, options.pattern_databases, options.resume)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print("%d instances in %.1f s (%.1f per second): %s" % (total, elapsed, total / elapsed if elapsed else 0.0,
+                                                             ", ".join("%d %s" % (counts[status], status)
+                                                                       for status in sorted(counts))))
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
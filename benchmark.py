@@ -0,0 +1,238 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from search import Node, solve
+from problem import *
+
+"""the benchmark suite of the search engine. It builds the same instances from a seed every time: random 8-puzzles for
+each optimal depth, the standard peg solitaire openings of the English board and a few shorter peg endgames, and
+missionaries and cannibals with different numbers of people and boat sizes. Every strategy runs on every instance
+with the same budgets and the statistics are written to a JSON file. Given the JSON file of an earlier run (the
+baseline), the results are compared to it and the script fails if one of them got worse by more than the threshold,
+so a change to search.py or problem.py can be accepted or rejected on numbers.
+The searches run without printing their progress since printing to the console would dominate the time, and each one
+is run a few times (--repeat) so that the speeds that are compared are not the noise of a single run.
+Usage: python benchmark.py [--output results.json] [--baseline baseline.json] [--threshold 0.1] (see --help)"""
+
+E = 2  # a cell that is not part of the peg solitaire board
+ENGLISH_BOARD = [E, E, 1, 1, 1, E, E,
+                 E, E, 1, 1, 1, E, E,
+                 1, 1, 1, 1, 1, 1, 1,
+                 1, 1, 1, 0, 1, 1, 1,
+                 1, 1, 1, 1, 1, 1, 1,
+                 E, E, 1, 1, 1, E, E,
+                 E, E, 1, 1, 1, E, E]
+ENGLISH_GOAL = [0 if cell == 1 else cell for cell in ENGLISH_BOARD]
+ENGLISH_GOAL[24] = 1
+EIGHT_PUZZLE_GOAL = [1, 2, 3, 4, 5, 6, 7, 8, 0]
+STRATEGIES = {1: "BFS", 2: "DFS", 3: "GBFS", 4: "A*", 5: "IDDFS", 6: "IDA*", 7: "Bidirectional BFS",
+              8: "Bidirectional A*", 9: "Distance table", 10: "Anytime A*"}
+"""for each statistic, 1 if a higher value is better and -1 if a lower value is better"""
+METRICS = {"expanded": -1, "expansions_per_second": 1, "peak_memory": -1, "peak_frontier": -1, "cost": -1}
+MIN_TIMED = 0.05  # the speed of a search that took less seconds than this is mostly noise and is not compared
+REPEAT = 3  # the suite is run this many times and the fastest run of each search is kept (see run_suite)
+
+
+def eight_puzzle_instances(rng, depths, per_depth):
+    """returns (name, initial state) for per_depth random 8-puzzles of each of the optimal depths. The states at each
+    depth are found with a breadth-first search from the goal (a state first reached at depth d is d moves away from
+    the goal) and the instances are drawn from them"""
+    problem = Eight_PuzzleProblem(EIGHT_PUZZLE_GOAL, EIGHT_PUZZLE_GOAL)
+    seen = {problem.goal}
+    layer = [problem.goal]
+    instances = list()
+    for depth in range(1, max(depths) + 1):
+        next_layer = list()
+        for state in layer:
+            for child in problem.successor_function(Node(state)):
+                if child.state not in seen:
+                    seen.add(child.state)
+                    next_layer.append(child.state)
+        layer = next_layer
+        if depth in depths:
+            for i, state in enumerate(rng.sample(layer, min(per_depth, len(layer)))):
+                instances.append(("8-puzzle depth %d #%d" % (depth, i + 1), problem.decode_state(state)))
+    return instances
+
+
+def peg_openings():
+    """returns (name, initial state, goal) for the standard openings of the English board: a hole in one cell at the
+    start and a single peg left in the same cell at the end (the central game and its complement problems). The openings
+    that are rotations or reflections of another one and the ones that cannot be solved are left out"""
+    english = PegProblem(ENGLISH_BOARD, ENGLISH_GOAL)  # its symmetries are all the symmetries of the board
+    openings = list()
+    seen = set()
+    for cell in range(49):
+        if ENGLISH_BOARD[cell] == E:
+            continue
+        initial = [E if value == E else 1 for value in ENGLISH_BOARD]
+        initial[cell] = 0
+        goal = [E if value == E else 0 for value in ENGLISH_BOARD]
+        goal[cell] = 1
+        key = english.state_key(english.encode_state(initial))
+        if key in seen or not PegProblem(initial, goal).is_solvable():
+            continue
+        seen.add(key)
+        openings.append(("peg opening %d,%d" % (int(cell / 7), cell % 7), initial, goal))
+    return openings
+
+
+def peg_endgames(rng, jumps, count):
+    """returns (name, initial state, goal) for count peg solitaire problems of the English board whose goal is the board
+    reached after the given number of random jumps from the usual start, short enough for every strategy"""
+    problem = PegProblem(ENGLISH_BOARD, ENGLISH_GOAL)
+    instances = list()
+    for i in range(count):
+        node = Node(problem.initial_state)
+        for _ in range(jumps):
+            node = rng.choice(problem.successor_function(node))
+        instances.append(("peg %d jumps #%d" % (jumps, i + 1), ENGLISH_BOARD, problem.decode_state(node.state)))
+    return instances
+
+
+def instances(seed=0, depths=(4, 8, 12, 16, 20, 24), per_depth=2, peg_jumps=(6, 10),
+              missionaries=((3, 2), (4, 3), (5, 3), (6, 4), (20, 4))):
+    """returns the instances of the suite as (name, function that builds the problem, strategies to run), the same for
+    the same seed"""
+    rng = random.Random(seed)
+    general = [1, 2, 3, 4, 5, 6, 7, 8, 10]  # the distance table is only for the 8-puzzle
+    suite = list()
+    for name, initial in eight_puzzle_instances(rng, depths, per_depth):
+        suite.append((name, lambda initial=initial: Eight_PuzzleProblem(initial, EIGHT_PUZZLE_GOAL), range(1, 11)))
+    for name, initial, goal in peg_openings():
+        suite.append((name, lambda initial=initial, goal=goal: PegProblem(initial, goal), general))
+    for jumps in peg_jumps:
+        for name, initial, goal in peg_endgames(rng, jumps, 2):
+            suite.append((name, lambda initial=initial, goal=goal: PegProblem(initial, goal), general))
+    for people, capacity in missionaries:
+        suite.append(("missionaries %d boat %d" % (people, capacity),
+                      lambda people=people, capacity=capacity: ProblemMissionaries([people, people, 1], [0, 0, 0],
+                                                                                   people, capacity), general))
+    return suite
+
+
+def run(make_problem, strategy, max_nodes, max_time, memory):
+    """runs one search and returns its statistics. The peak memory is measured with tracemalloc in a second run of the
+    same search, since tracing every allocation slows the search down too much to time it (None if memory is False)"""
+    result = solve(make_problem(), strategy, max_nodes=max_nodes, max_time=max_time)
+    record = {"status": result.status, "expanded": result.expanded, "loops": result.loops,
+              "expansions_per_second": round(result.expanded / result.wall_time) if result.wall_time else None,
+              "wall_time": round(result.wall_time, 4), "peak_frontier": result.peak_frontier,
+              "cost": result.node.path_cost if result.node else None, "peak_memory": None}
+    if memory:
+        problem = make_problem()
+        tracemalloc.start()
+        try:
+            solve(problem, strategy, max_nodes=max_nodes, max_time=max_time)
+            record["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+def run_suite(suite, strategies, max_nodes, max_time, memory, repeat=REPEAT):
+    """runs the strategies on the instances of the suite, prints one line per search and returns the list of records.
+    The whole suite is run repeat times and each search keeps the statistics of its fastest run (the most expansions
+    per second, which is also the shortest run unless the time budget stopped it). A single run, or runs of the same
+    search one after the other, can all be slowed down by whatever else the machine is doing at that moment, and
+    comparing them reports regressions that are only noise; the rounds spread the runs of a search over the whole
+    benchmark. The peak memory is only measured in the first round"""
+    searches = [(name, make_problem, strategy) for name, make_problem, instance_strategies in suite
+                for strategy in instance_strategies if strategy in strategies]
+    best = [None] * len(searches)
+    for round_number in range(max(1, repeat)):
+        for i, (name, make_problem, strategy) in enumerate(searches):
+            record = run(make_problem, strategy, max_nodes, max_time, memory and round_number == 0)
+            if best[i] is None:
+                record["instance"] = name
+                record["strategy"] = STRATEGIES[strategy]
+                best[i] = record
+            elif record["expansions_per_second"] and record["expansions_per_second"] > \
+                    (best[i]["expansions_per_second"] or 0):
+                record.update({"instance": name, "strategy": STRATEGIES[strategy],
+                               "peak_memory": best[i]["peak_memory"]})
+                best[i] = record
+    for record in best:
+        print("%-24s %-17s %-11s %7d expanded %8s exp/s %7s KB %7d frontier  cost %s"
+              % (record["instance"], record["strategy"], record["status"], record["expanded"],
+                 record["expansions_per_second"], record["peak_memory"] and int(record["peak_memory"] / 1024),
+                 record["peak_frontier"], record["cost"]))
+    return best
+
+
+def compare(results, baseline, threshold):
+    """returns the regressions of results with respect to baseline (both lists of records) as lines of text. A statistic
+    is a regression if it got worse by more than threshold (0.1 is 10 %), a search that was solved in the baseline and
+    is not anymore is always one. The statistics of a search that did not end the same way are not compared, and neither
+    is the speed of a search that was too short to be timed"""
+    regressions = list()
+    previous = dict(((record["instance"], record["strategy"]), record) for record in baseline)
+    for record in results:
+        old = previous.get((record["instance"], record["strategy"]))
+        if old is None:
+            continue
+        name = "%s / %s" % (record["instance"], record["strategy"])
+        if old["status"] != record["status"]:
+            if old["status"] == "solved":
+                regressions.append("%s: %s instead of solved" % (name, record["status"]))
+            continue
+        for metric, direction in METRICS.items():
+            before, after = old.get(metric), record.get(metric)
+            if not before or after is None:
+                continue
+            if metric == "expansions_per_second" and min(old["wall_time"], record["wall_time"]) < MIN_TIMED:
+                continue
+            change = (after - before) / before
+            if change * direction < -threshold:
+                regressions.append("%s: %s went from %s to %s (%+.1f %%)" % (name, metric, before, after, 100 * change))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="benchmark suite of the search strategies")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random instances")
+    parser.add_argument("--per-depth", type=int, default=2, help="number of 8-puzzles for each optimal depth")
+    parser.add_argument("--strategies", default="1,2,3,4,5,6,7,8,9,10", help="strategies to run, e.g. 1,4,8")
+    parser.add_argument("--max-nodes", type=int, default=5000, help="budget of expanded nodes of each search")
+    parser.add_argument("--max-time", type=float, default=10.0, help="budget of seconds of each search")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="rounds of the suite, the fastest run of each search is kept")
+    parser.add_argument("--no-memory", action="store_true", help="do not measure the peak memory")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as a regression")
+    options = parser.parse_args(arguments)
+    strategies = [int(strategy) for strategy in options.strategies.split(",")]
+    suite = instances(options.seed, per_depth=options.per_depth)
+    started = time.perf_counter()
+    results = run_suite(suite, strategies, options.max_nodes, options.max_time, not options.no_memory, options.repeat)
+    print("%d searches in %.1f s" % (len(results), time.perf_counter() - started))
+    report = {"seed": options.seed, "per_depth": options.per_depth, "max_nodes": options.max_nodes,
+              "max_time": options.max_time, "repeat": options.repeat, "python": platform.python_version(),
+              "results": results}
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=1)
+        print("Results written to", options.output)
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        if (baseline["seed"], baseline["per_depth"], baseline["max_nodes"], baseline["max_time"]) != \
+                (options.seed, options.per_depth, options.max_nodes, options.max_time):
+            print("The baseline was run with another seed or budget, its instances cannot be compared")
+            return 2
+        regressions = compare(results, baseline["results"], options.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        print("%d regressions over a threshold of %.0f %%" % (len(regressions), 100 * options.threshold))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import glob
+import json
+import os
+import time
+
+from search import Node, path_to_node
+from vector_search import numpy, layer_moves, LayeredSearchResult
+
+"""breadth-first search that keeps its layers on disk, for state spaces that do not fit in memory (the whole peg
+solitaire board, deep layers of the 15-puzzle). It uses the array moves of vector_search.py, so it also needs numpy.
+Each layer is a file of sorted packed states (the keys of vector_search, 8 bytes each after a header of 8 bytes) in
+the directory of the search, and the files are read through memory mapping so only the parts that are used are in
+memory. A layer is built from the previous one in two steps:
+- the previous layer is read in chunks and expanded, and the children are collected until buffer_size bytes are used,
+  then they are sorted, their duplicates removed, and they are written as a run (a sorted file);
+- the runs are merged block by block: the blocks of all the runs are read up to the smallest last value of the blocks,
+  which is the part that is complete in every run, the duplicates are removed, the states found in the layers a child
+  can be in (see vector_search lookback) are removed with a binary search in these sorted files, and the rest is
+  appended to the new layer.
+So the memory used is a few times buffer_size (the children, their sorted copy and the arrays of the moves), whatever
+the size of the layers. A layer file is only written under its name once it is complete, so a search that was stopped
+(or ran out of time) goes on from the last complete layer when it is run again on the same directory. No parent is
+kept for the states: the path is found at the end by going backward from the goal, each time looking for a predecessor
+of the state (Problem.predecessor_function) in the layer before"""
+
+MAGIC = b"BFS1"
+HEADER = 8  # the magic and 4 bytes of padding, so the states are aligned in the file
+
+
+def layer_path(directory, depth):
+    return os.path.join(directory, "layer_%04d.bin" % depth)
+
+
+def write_states(path, states):
+    """writes a sorted array of uint64 states to path, through a temporary file so that path is always complete"""
+    with open(path + ".tmp", "wb") as file:
+        file.write(MAGIC + bytes(HEADER - len(MAGIC)))
+        states.tofile(file)
+    os.replace(path + ".tmp", path)
+
+
+def read_states(path):
+    """returns the states of a file written by write_states as a memory-mapped array"""
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a layer of a disk search" % path)
+    if os.path.getsize(path) == HEADER:
+        return numpy.zeros(0, dtype=numpy.uint64)
+    return numpy.memmap(path, dtype=numpy.uint64, mode="r", offset=HEADER)
+
+
+def contains(states, value):
+    position = int(numpy.searchsorted(states, value))
+    return position < len(states) and states[position] == value
+
+
+def sorted_unique(parts):
+    """returns the states of the list of arrays parts sorted and without duplicates. The list is emptied so that the
+    arrays can be freed, and the states are sorted in place, which needs less memory than numpy.unique"""
+    states = numpy.concatenate(parts)
+    del parts[:]
+    states.sort()
+    if len(states) > 1:
+        keep = numpy.empty(len(states), dtype=bool)
+        keep[0] = True
+        numpy.not_equal(states[1:], states[:-1], out=keep[1:])
+        states = states[keep]
+    return states
+
+
+def remove_known(states, layers):
+    """removes from the sorted array states the ones that are in one of the sorted layers, only the part of each layer
+    between the smallest and the largest state is read"""
+    for layer in layers:
+        if not len(states):
+            break
+        window = layer[numpy.searchsorted(layer, states[0]):numpy.searchsorted(layer, states[-1], side="right")]
+        if len(window):
+            position = numpy.minimum(numpy.searchsorted(window, states), len(window) - 1)
+            states = states[window[position] != states]
+    return states
+
+
+def merge_runs(runs, layers, path, block):
+    """merges the sorted runs into the layer file path without duplicates and without the states of layers, reading
+    block states of each run at a time. Returns the number of states written"""
+    positions = [0] * len(runs)
+    count = 0
+    with open(path + ".tmp", "wb") as file:
+        file.write(MAGIC + bytes(HEADER - len(MAGIC)))
+        while True:
+            active = [i for i in range(len(runs)) if positions[i] < len(runs[i])]
+            if not active:
+                break
+            blocks = [runs[i][positions[i]:positions[i] + block] for i in active]
+            cut = min(states[-1] for states in blocks)  # every run is complete up to this state
+            parts = list()
+            for i, states in zip(active, blocks):
+                end = int(numpy.searchsorted(states, cut, side="right"))
+                parts.append(states[:end])
+                positions[i] += end
+            states = remove_known(sorted_unique(parts), layers)
+            states.tofile(file)
+            count += len(states)
+    os.replace(path + ".tmp", path)
+    return count
+
+
+def check_directory(problem, directory):
+    """writes the description of the problem in the directory of a new search, or checks that a directory that already
+    has layers was used for the same problem"""
+    description = {"problem": type(problem).__name__, "initial": problem.decode_state(problem.initial_state),
+                   "goal": problem.decode_state(problem.goal), "symmetry": bool(getattr(problem, "symmetries", None))}
+    path = os.path.join(directory, "search.json")
+    if os.path.exists(path):
+        with open(path) as file:
+            if json.load(file) != description:
+                raise ValueError("%s has the layers of another problem" % directory)
+    else:
+        with open(path, "w") as file:
+            json.dump(description, file)
+
+
+def disk_bfs(problem, directory, buffer_size=64 * 2 ** 20, max_time=None, stop_at_goal=True):
+    """breadth-first search of the problem with its layers in files in directory (created if needed, and resumed if it
+    already has layers of this problem). buffer_size is the number of bytes of children kept in memory before they are
+    written as a run. Returns a vector_search.LayeredSearchResult, the statistics being the ones of this run of the
+    search and layers the sizes of all the layers. With stop_at_goal False every reachable state is found. max_time is
+    checked after each chunk of the previous layer, the layer being built is then lost but the complete ones are kept
+    for the next run"""
+    if numpy is None:
+        raise ImportError("the disk search needs numpy (pip install numpy)")
+    start = time.perf_counter()
+    moves = layer_moves(problem)
+    if not problem.is_solvable():
+        return LayeredSearchResult(None, "unsolvable", 0, 0, dict(), 0, time.perf_counter() - start, list())
+    os.makedirs(directory, exist_ok=True)
+    check_directory(problem, directory)
+    for path in glob.glob(os.path.join(directory, "*.tmp")) + glob.glob(os.path.join(directory, "run_*.bin")):
+        os.remove(path)  # left by a search that was stopped in the middle of a layer
+    if not os.path.exists(layer_path(directory, 0)):
+        write_states(layer_path(directory, 0), moves.keys(numpy.array([moves.pack(problem.initial_state)],
+                                                                      dtype=numpy.uint64)))
+    layers = list()
+    while os.path.exists(layer_path(directory, len(layers))):
+        layers.append(read_states(layer_path(directory, len(layers))))
+    goal = moves.keys(numpy.array([moves.pack(problem.goal)], dtype=numpy.uint64))[0]
+    found = None
+    for depth in range(len(layers)):
+        if contains(layers[depth], goal):
+            found = depth
+            break
+    buffer_states = max(1024, int(buffer_size / 8))
+    expanded, loops, pruned, status = 0, 0, dict(), None
+    while len(layers[-1]) and not (found is not None and stop_at_goal):
+        depth = len(layers)
+        layer, runs, children, size = layers[-1], list(), list(), 0
+        for first in range(0, len(layer), max(1, int(buffer_states / 16))):
+            if max_time is not None and time.perf_counter() - start >= max_time:
+                status = "time limit"
+                break
+            parents = numpy.array(layer[first:first + max(1, int(buffer_states / 16))])
+            expanded += len(parents)
+            states = moves.expand(parents)[0]
+            alive = moves.alive(states, pruned)
+            if alive is not None:
+                states = states[alive]
+            children.append(moves.keys(states))
+            size += len(states)
+            if size >= buffer_states:
+                runs.append(write_run(directory, len(runs), children))
+                loops += size - len(runs[-1])
+                size = 0
+        if status is not None:
+            break
+        if size:
+            runs.append(write_run(directory, len(runs), children))
+            loops += size - len(runs[-1])
+        previous = layers[-moves.lookback:] if moves.lookback else list()
+        count = merge_runs(runs, previous, layer_path(directory, depth),
+                           max(1024, int(buffer_states / (len(runs) + 1))))
+        loops += sum(len(run) for run in runs) - count
+        for i in range(len(runs)):
+            os.remove(os.path.join(directory, "run_%04d.bin" % i))
+        layers.append(read_states(layer_path(directory, depth)))
+        if found is None and contains(layers[-1], goal):
+            found = depth
+    node = None
+    if found is not None:
+        node = backward_path(problem, moves, layers, found)
+        status = "solved"
+    elif status is None:
+        status = "no solution"
+    sizes = [len(layer) for layer in layers]
+    if sizes and not sizes[-1]:
+        sizes.pop()
+    return LayeredSearchResult(node, status, expanded, loops, pruned, max(sizes), time.perf_counter() - start, sizes)
+
+
+def write_run(directory, number, children):
+    """sorts the children (a list of arrays, emptied), removes their duplicates and writes them as a run, returns the
+    run as a memory-mapped array"""
+    path = os.path.join(directory, "run_%04d.bin" % number)
+    write_states(path, sorted_unique(children))
+    return read_states(path)
+
+
+def backward_path(problem, moves, layers, depth):
+    """returns the goal node, found at the given depth, with its parents up to the initial state. Going backward from
+    the goal, the state at depth d has a predecessor in the layer d - 1 (the one it was first reached from), it is found
+    by looking up the keys of its predecessors in that layer"""
+    steps = list()  # (state, action) from the goal back to the initial state, the action leads to the state
+    target = problem.goal
+    while depth > 0:
+        for predecessor in problem.predecessor_function(Node(target)):
+            key = moves.keys(numpy.array([moves.pack(predecessor.state)], dtype=numpy.uint64))[0]
+            if contains(layers[depth - 1], key):
+                break
+        else:
+            raise ValueError("the layer %d has no predecessor of a state of the layer %d" % (depth - 1, depth))
+        steps.append((target, predecessor.action))
+        target, depth = predecessor.state, depth - 1
+    steps.append((target, None))
+    steps.reverse()
+    return path_to_node(steps, problem)
@@ -0,0 +1,105 @@
+import mmap
+import os
+from collections import deque
+
+from pattern_database import placement_index
+from search import Node
+from problem import SlidingPuzzleProblem
+
+"""exact distance tables for the 8-puzzle. Only 181440 states can reach a given goal, so a breadth-first search backward
+from the goal can store the optimal number of moves of every one of them. A state is ranked by the position of the blank
+and the order of the 8 tiles read row by row without the blank. The moves never change the parity of that order (see
+Eight_PuzzleProblem.is_solvable), so the order of the last two tiles is fixed by the first six, and these six are ranked
+like a pattern of 6 of the 8 tiles (see pattern_database.py). The rank is then unique among the states that can reach
+the goal and the table has exactly 9 * 20160 = 181440 entries of one byte (about 180 KB).
+The table of a goal is built the first time it is needed, written to a file and then memory-mapped, so it is shared by
+all the processes that use it. The tables that were opened are also kept in tables so they are only opened once"""
+
+MAGIC = b"DST1"
+SIZE = 181440  # 9! / 2
+UNREACHED = 255
+tables = dict()  # tuple(goal) -> DistanceTable
+
+
+def rank(state):
+    """state is a list of 9 cells, returns its index in the table"""
+    tiles = [tile - 1 for tile in state if tile]
+    return state.index(0) * 20160 + placement_index(tiles[:6], 8)
+
+
+def build_distance_table(goal, path):
+    """breadth-first search backward from the goal (a list of 9 cells) over all the states that can reach it, the moves of
+    the blank can be undone so the states that lead to a state are its neighbours. The distances are written to path"""
+    neighbours = list()
+    for blank in range(9):
+        neighbours.append([cell for cell in (blank - 3, blank + 3, blank - 1, blank + 1)
+                           if 0 <= cell < 9 and (cell % 3 == blank % 3 or int(cell / 3) == int(blank / 3))])
+    table = bytearray([UNREACHED]) * SIZE
+    table[rank(goal)] = 0
+    queue = deque()
+    queue.append((tuple(goal), goal.index(0)))
+    while queue:
+        state, blank = queue.popleft()
+        distance = table[rank(state)] + 1
+        for cell in neighbours[blank]:
+            child = list(state)
+            child[blank], child[cell] = child[cell], 0
+            index = rank(child)
+            if table[index] == UNREACHED:
+                table[index] = distance
+                queue.append((tuple(child), cell))
+    with open(path, "wb") as file:
+        file.write(MAGIC + bytes(goal))
+        file.write(table)
+
+
+class DistanceTable:
+    """the distance table of one goal, read from the memory-mapped file written by build_distance_table"""
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != MAGIC or len(self.data) != 13 + SIZE:
+            raise ValueError("%s is not a distance table" % path)
+        self.goal = list(self.data[4:13])
+
+    def distance(self, state):
+        """returns the optimal number of moves from the state (a list of 9 cells) to the goal, the state must be able to
+        reach the goal (see Eight_PuzzleProblem.is_solvable)"""
+        return self.data[13 + rank(state)]
+
+
+def load_distance_table(goal, directory="."):
+    """returns the distance table of the goal (a list of 9 cells). It is opened from directory if it was already built
+    there, otherwise it is built and saved there first"""
+    key = tuple(goal)
+    if key not in tables:
+        path = os.path.join(directory, "distance_table_%s.bin" % "".join(str(tile) for tile in goal))
+        if not os.path.exists(path):
+            """the table is written to a temporary file first so that another process never opens half a table"""
+            build_distance_table(list(goal), path + ".%d.tmp" % os.getpid())
+            os.replace(path + ".%d.tmp" % os.getpid(), path)
+        tables[key] = DistanceTable(path)
+    return tables[key]
+
+
+def table_search(problem, directory="."):
+    """solves an Eight_PuzzleProblem optimally with the distance table of its goal: from the initial state we always move
+    to a successor that is one move closer to the goal. An initial state that cannot reach the goal (wrong parity) is
+    rejected without searching. Returns the goal node or None. Raises ValueError for any other problem, before a table
+    is built for it"""
+    puzzle = getattr(problem, "wrapped_problem", problem)  # the problem inside an instrumentation.TimedProblem
+    if not isinstance(puzzle, SlidingPuzzleProblem) or puzzle.cells != 9 \
+            or sorted(puzzle.decode_state(puzzle.goal)) != list(range(9)):
+        raise ValueError("the distance table (strategy 9) only solves the 8-puzzle, not %s" % type(puzzle).__name__)
+    if not problem.is_solvable():
+        return None
+    table = load_distance_table(problem.decode_state(problem.goal), directory)
+    node = Node(problem.initial_state)
+    distance = table.distance(problem.decode_state(node.state))
+    while distance > 0:
+        for child in problem.successor_function(node):
+            if table.distance(problem.decode_state(child.state)) == distance - 1:
+                node = child
+                break
+        distance -= 1
+    return node
@@ -0,0 +1,301 @@
+import cProfile
+import json
+import time
+
+import search
+
+"""listeners that observe a search (see search.SearchEngine). The engine tells its listener about each event of the
+search: a node is expanded, a child is generated, a child is a duplicate (a loop), a child is pruned as a dead end, a
+child is put in the frontier (enqueued), IDA* starts a new bound and the anytime search finds a better solution.
+Without listeners the engine does not build or print anything for these events, so a search that is not observed runs
+at full speed.
+The listeners of this module print the progress to the console (what our first version printed for every node), count
+the events, write a sample of them to a trace file and time the phases of the search. profile_search runs a search
+under cProfile"""
+
+
+class SearchListener:
+    """the listener that does nothing, the other listeners override the events they need. on_start is called with the
+    engine before the search starts and on_finish with the SearchResult at the end"""
+    def on_start(self, engine):
+        pass
+
+    def on_frontier(self, frontier):
+        pass
+
+    def on_expand(self, node):
+        pass
+
+    def on_generate(self, node):
+        pass
+
+    def on_duplicate(self, node):
+        pass
+
+    def on_prune(self, node, rule):
+        pass
+
+    def on_enqueue(self, node, value):
+        pass
+
+    def on_bound(self, bound):
+        pass
+
+    def on_solution(self, node, bound):
+        pass
+
+    def on_finish(self, result):
+        pass
+
+
+class ListenerGroup(SearchListener):
+    """passes every event to each listener of a list"""
+    def __init__(self, listeners):
+        self.listeners = listeners
+
+    def on_start(self, engine):
+        for listener in self.listeners:
+            listener.on_start(engine)
+
+    def on_frontier(self, frontier):
+        for listener in self.listeners:
+            listener.on_frontier(frontier)
+
+    def on_expand(self, node):
+        for listener in self.listeners:
+            listener.on_expand(node)
+
+    def on_generate(self, node):
+        for listener in self.listeners:
+            listener.on_generate(node)
+
+    def on_duplicate(self, node):
+        for listener in self.listeners:
+            listener.on_duplicate(node)
+
+    def on_prune(self, node, rule):
+        for listener in self.listeners:
+            listener.on_prune(node, rule)
+
+    def on_enqueue(self, node, value):
+        for listener in self.listeners:
+            listener.on_enqueue(node, value)
+
+    def on_bound(self, bound):
+        for listener in self.listeners:
+            listener.on_bound(bound)
+
+    def on_solution(self, node, bound):
+        for listener in self.listeners:
+            listener.on_solution(node, bound)
+
+    def on_finish(self, result):
+        for listener in self.listeners:
+            listener.on_finish(result)
+
+
+def combine_listeners(listeners):
+    """returns one listener for a list of listeners"""
+    if len(listeners) == 1:
+        return listeners[0]
+    return ListenerGroup(listeners)
+
+
+class ConsoleListener(SearchListener):
+    """prints the progress of the search to the console like our first version did: every node to expand with the number
+    of expanded nodes, every generated node, the loops, the pruned dead ends, the heuristic values of GBFS and the
+    evaluation values of A*, and the totals at the end"""
+    def on_start(self, engine):
+        self.engine = engine
+        self.problem = engine.problem
+
+    def on_expand(self, node):
+        print("node to expand")
+        print(self.problem.decode_state(node.state))
+        print("Number of expanded nodes is:", self.engine.number_expanded_nodes)
+
+    def on_generate(self, node):
+        print("current generated node")
+        print(self.problem.decode_state(node.state))
+
+    def on_duplicate(self, node):
+        print("A loop has been detected")
+        print("Number of loops is: ", self.engine.number_loops)
+
+    def on_prune(self, node, rule):
+        print("A dead end has been pruned by the rule:", rule)
+
+    def on_enqueue(self, node, value):
+        if self.engine.strategy == 3:
+            print("The heuristic value is: ")
+            print(value)
+        elif self.engine.strategy in (4, 8, 10):
+            print("The evaluation function value is: ")
+            print(value)
+
+    def on_bound(self, bound):
+        print("Searching with the bound: ", bound)
+
+    def on_solution(self, node, bound):
+        print("A solution of cost %d has been found, it costs at most %.2f times the optimal cost" % (node.path_cost,
+                                                                                                       bound))
+
+    def on_finish(self, result):
+        if result.status == "unsolvable":
+            print("The goal cannot be reached from the initial state")
+        print("Total number of loops is: ", result.loops)
+        print("Total number of nodes expanded is: ", result.expanded)
+        if result.pruned:
+            print("Total number of pruned nodes for each rule is: ", result.pruned)
+        if self.engine.strategy == 9 and result.node is not None:
+            print("The optimal number of moves is: ", result.node.path_cost)
+
+
+class EventCounter(SearchListener):
+    """counts the events of each type, counts["expand"], counts["generate"], counts["duplicate"], counts["prune"],
+    counts["enqueue"], counts["bound"] and counts["solution"]"""
+    def __init__(self):
+        self.counts = dict((event, 0) for event in ("expand", "generate", "duplicate", "prune", "enqueue", "bound",
+                                                    "solution"))
+
+    def on_expand(self, node):
+        self.counts["expand"] += 1
+
+    def on_generate(self, node):
+        self.counts["generate"] += 1
+
+    def on_duplicate(self, node):
+        self.counts["duplicate"] += 1
+
+    def on_prune(self, node, rule):
+        self.counts["prune"] += 1
+
+    def on_enqueue(self, node, value):
+        self.counts["enqueue"] += 1
+
+    def on_bound(self, bound):
+        self.counts["bound"] += 1
+
+    def on_solution(self, node, bound):
+        self.counts["solution"] += 1
+
+
+class TraceListener(SearchListener):
+    """writes one event out of every to a trace file, one JSON object per line with the number of the event, its type,
+    the depth and path cost of the node and its state (in the list format of the problem), plus the value of enqueued
+    nodes and the rule of pruned ones. file is a path or an open file. With every = 1 all the events are written"""
+    def __init__(self, file, every=1):
+        self.file = file
+        self.every = every
+        self.events = 0
+
+    def on_start(self, engine):
+        self.problem = engine.problem
+        self.output = open(self.file, "w") if isinstance(self.file, str) else self.file
+        self.start = time.perf_counter()
+
+    def write(self, event, node, extra=None):
+        self.events += 1
+        if self.events % self.every:
+            return
+        record = {"event": event, "number": self.events, "time": round(time.perf_counter() - self.start, 6),
+                  "depth": node.depth, "path_cost": node.path_cost, "state": self.problem.decode_state(node.state)}
+        if extra:
+            record.update(extra)
+        self.output.write(json.dumps(record) + "\n")
+
+    def on_expand(self, node):
+        self.write("expand", node)
+
+    def on_generate(self, node):
+        self.write("generate", node)
+
+    def on_duplicate(self, node):
+        self.write("duplicate", node)
+
+    def on_prune(self, node, rule):
+        self.write("prune", node, {"rule": rule})
+
+    def on_enqueue(self, node, value):
+        self.write("enqueue", node, {"value": value})
+
+    def on_solution(self, node, bound):
+        self.write("solution", node, {"bound": bound})
+
+    def on_finish(self, result):
+        self.output.write(json.dumps({"event": "finish", "status": result.status, "expanded": result.expanded,
+                                      "wall_time": result.wall_time}) + "\n")
+        if self.output is not self.file:
+            self.output.close()
+        else:
+            self.output.flush()
+
+
+class PhaseTimer(SearchListener):
+    """measures the time the search spends in each phase: "successors" (successor and predecessor functions),
+    "duplicate check" (computing the keys of the states, see Problem.state_key), "heuristic", "dead-end check", "goal
+    test" and "queue" (push and pop of the frontiers). The problem is wrapped in a TimedProblem for this search only and
+    the push and pop of each frontier are replaced by timed ones, so nothing is timed when this listener is not used.
+    times[phase] is the total time in seconds and calls[phase] the number of calls"""
+    def __init__(self):
+        self.times = dict()
+        self.calls = dict()
+        self.total = 0.0
+
+    def on_start(self, engine):
+        engine.problem = TimedProblem(engine.problem, self)
+
+    def on_frontier(self, frontier):
+        frontier.push = self.timed("queue", frontier.push)
+        frontier.pop = self.timed("queue", frontier.pop)
+
+    def on_finish(self, result):
+        self.total = result.wall_time
+
+    def timed(self, phase, function):
+        """returns function with the time of its calls added to the phase"""
+        self.times.setdefault(phase, 0.0)
+        self.calls.setdefault(phase, 0)
+        def timed_function(*args):
+            start = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                self.times[phase] += time.perf_counter() - start
+                self.calls[phase] += 1
+        return timed_function
+
+    def report(self):
+        """returns the phases that were used as lines of text, the longest first, with the part of the search they took"""
+        lines = list()
+        for phase in sorted(self.times, key=self.times.get, reverse=True):
+            if not self.calls[phase]:
+                continue
+            share = 100.0 * self.times[phase] / self.total if self.total else 0.0
+            lines.append("%-16s %10d calls %9.3f s %6.1f %%" % (phase, self.calls[phase], self.times[phase], share))
+        return lines
+
+
+class TimedProblem:
+    """stands for a problem during one search: the methods of the timed phases go through PhaseTimer.timed and
+    everything else is read from the problem itself"""
+    phases = {"successor_function": "successors", "predecessor_function": "successors", "state_key": "duplicate check",
+              "heuristic_value": "heuristic", "child_heuristic_value": "heuristic",
+              "backward_heuristic_value": "heuristic", "is_dead_end": "dead-end check", "goal_test": "goal test"}
+
+    def __init__(self, problem, timer):
+        self.wrapped_problem = problem
+        for name, phase in self.phases.items():
+            setattr(self, name, timer.timed(phase, getattr(problem, name)))
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped_problem, name)
+
+
+def profile_search(problem, strategy, path, **options):
+    """runs search.solve under cProfile and writes the statistics to path (they can be read with the pstats module or
+    tools like snakeviz), returns the SearchResult. options are the other arguments of search.solve"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(search.solve, problem, strategy, **options)
+    profiler.dump_stats(path)
+    return result
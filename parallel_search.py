@@ -0,0 +1,305 @@
+import multiprocessing
+import os
+import time
+from heapq import heappush, heappop
+from queue import Empty
+
+from search import Node, SearchResult, heuristic, path_to_node
+
+"""hash-distributed A* (HDA*): one A* search spread over several worker processes so that a single hard instance can
+use all the cores. Every state has an owner, the worker given by a hash of its key (see Problem.state_key), and only
+the owner keeps the state in its open and closed lists. A worker expands the best nodes of its own open list and sends
+each child to the worker that owns it. The children for the same worker are collected and sent together (batch_size
+expansions at a time), since sending a message costs much more than expanding a node.
+The first goal that is found is not always the optimal one, the other workers may still have nodes with a smaller
+evaluation. The cost of the best goal found so far (the incumbent) is sent to all the workers, which stop expanding
+nodes whose evaluation is not smaller than it. The search is over when every worker has run out of such nodes and no
+batch of nodes is still on its way. This is checked by the coordinator (the calling process) with waves of status
+requests: each worker answers whether it is idle and how many batches it has sent and received. If two waves in a row
+find all the workers idle with the same counts, and all the batches that were sent have been received, nothing happened
+between the two waves and nothing can happen any more (a worker only becomes busy again when it receives a batch). With
+an admissible heuristic the incumbent is then optimal, since a state that is reached by a cheaper path is reopened.
+The path is found at the end by asking the owner of each state on it for the state it was reached from.
+The workers are started with fork where it exists, so the problem is not pickled and memory-mapped pattern databases
+are shared. The budgets are checked by the coordinator at each wave, so the search may go a little over them"""
+
+MIX = 0x9E3779B97F4A7C15  # spreads the hash of the packed states over all the bits before taking the owner
+
+
+def owner(key, workers):
+    """returns the worker that owns the states with the given key. The packed states differ mostly in a few bits (the
+    lower cells of a board, the first tiles of a puzzle), so the hash is mixed before taking it modulo the workers"""
+    return ((hash(key) * MIX & 0xFFFFFFFFFFFFFFFF) >> 32) % workers
+
+
+class ParallelSearchResult(SearchResult):
+    """the SearchResult of hda_star, with the statistics of each worker in workers (a list of dictionaries with the
+    expanded, generated, duplicate and pruned nodes and the batches and nodes it sent and received)"""
+    def __init__(self, node, status, expanded, loops, pruned, peak_frontier, wall_time, workers):
+        super().__init__(node, status, expanded, loops, pruned, peak_frontier, wall_time)
+        self.workers = workers
+
+    def load_balance(self):
+        """returns the largest number of nodes expanded by one worker divided by the average, 1.0 if the work was spread
+        perfectly"""
+        expanded = [worker["expanded"] for worker in self.workers]
+        if not sum(expanded):
+            return 1.0
+        return max(expanded) * len(expanded) / sum(expanded)
+
+    def report(self):
+        """returns one line of text per worker with its share of the work and of the communication"""
+        total = sum(worker["expanded"] for worker in self.workers) or 1
+        lines = list()
+        for worker in self.workers:
+            lines.append("worker %d: %9d expanded (%5.1f %%) %9d duplicates %7d batches sent %9d nodes sent %9d received"
+                         % (worker["index"], worker["expanded"], 100.0 * worker["expanded"] / total,
+                            worker["duplicates"], worker["batches_sent"], worker["nodes_sent"],
+                            worker["nodes_received"]))
+        lines.append("load balance %.2f (1.00 is perfect)" % self.load_balance())
+        return lines
+
+
+class HdaWorker:
+    """the part of the search run by one worker process: the open list (a heap of (f, -g, counter, key, g) with lazy
+    deletion) and the table of the states it owns, key -> (g, state, parent key, parent state, action). The parent state
+    is the state that was expanded, it is needed to rebuild the path when the key treats symmetric states as the same"""
+    def __init__(self, problem, index, inboxes, coordinator, batch_size):
+        self.problem = problem
+        self.index = index
+        self.inboxes = inboxes
+        self.coordinator = coordinator
+        self.batch_size = batch_size
+        self.workers = len(inboxes)
+        self.heap = list()
+        self.table = dict()
+        self.counter = 0
+        self.incumbent = float("inf")
+        self.outboxes = [list() for _ in range(self.workers)]
+        self.stats = {"index": index, "expanded": 0, "generated": 0, "duplicates": 0, "pruned": dict(),
+                      "batches_sent": 0, "batches_received": 0, "nodes_sent": 0, "nodes_received": 0}
+
+    def run(self):
+        inbox = self.inboxes[self.index]
+        while True:
+            """the messages are read without waiting while there is work to do, and waited for when there is none"""
+            idle = self.idle()
+            while True:
+                try:
+                    message = inbox.get(block=idle)
+                except Empty:
+                    break
+                if message[0] == "stop":
+                    self.coordinator.put(("stats", self.index, self.stats))
+                    return
+                self.receive(message)
+                idle = False
+            self.expand_batch()
+
+    def has_work(self):
+        """True if the open list has a node whose evaluation is smaller than the incumbent"""
+        heap, table = self.heap, self.table
+        while heap and table[heap[0][3]][0] != heap[0][4]:
+            heappop(heap)  # a cheaper path to this state was found after it was pushed
+        return bool(heap) and heap[0][0] < self.incumbent
+
+    def idle(self):
+        """True if the worker has nothing to expand and nothing waiting to be sent"""
+        return not self.has_work() and not any(self.outboxes)
+
+    def receive(self, message):
+        kind = message[0]
+        if kind == "nodes":
+            self.stats["batches_received"] += 1
+            self.stats["nodes_received"] += len(message[1])
+            for entry in message[1]:
+                self.insert(*entry)
+        elif kind == "bound":
+            self.incumbent = min(self.incumbent, message[1])
+        elif kind == "status":
+            self.coordinator.put(("status", message[1], self.index, self.idle(), self.stats["batches_sent"],
+                                  self.stats["batches_received"], self.stats["expanded"], len(self.table),
+                                  len(self.heap)))
+        elif kind == "parent":
+            self.coordinator.put(("parent", message[1], self.table[message[1]]))
+
+    def insert(self, key, state, g, h, parent_key, parent_state, action):
+        """a node for a state owned by this worker: it is kept if its state is new or reached by a cheaper path"""
+        old = self.table.get(key)
+        if old is not None and old[0] <= g:
+            self.stats["duplicates"] += 1
+            return
+        self.table[key] = (g, state, parent_key, parent_state, action)
+        if self.problem.goal_test(state):
+            if g < self.incumbent:
+                self.incumbent = g
+                self.coordinator.put(("goal", g, key))
+            return
+        self.counter += 1
+        heappush(self.heap, (g + h, -g, self.counter, key, g))
+
+    def expand_batch(self):
+        """expands up to batch_size nodes, then sends the children that belong to the other workers"""
+        problem, table, heap, workers = self.problem, self.table, self.heap, self.workers
+        for _ in range(self.batch_size):
+            if not self.has_work():
+                break
+            f, _, _, key, g = heappop(heap)
+            state = table[key][1]
+            node = Node(state)
+            node.path_cost = node.depth = g
+            node.heuristic = f - g
+            self.stats["expanded"] += 1
+            for child in problem.successor_function(node):
+                self.stats["generated"] += 1
+                rule = problem.is_dead_end(child.state)
+                if rule is not None:
+                    self.stats["pruned"][rule] = self.stats["pruned"].get(rule, 0) + 1
+                    continue
+                h = heuristic(child, problem)
+                if child.path_cost + h >= self.incumbent:
+                    continue
+                child_key = problem.state_key(child.state)
+                entry = (child_key, child.state, child.path_cost, h, key, state, child.action)
+                destination = owner(child_key, workers)
+                if destination == self.index:
+                    self.insert(*entry)
+                else:
+                    self.outboxes[destination].append(entry)
+        for destination in range(workers):
+            if self.outboxes[destination]:
+                self.inboxes[destination].put(("nodes", self.outboxes[destination]))
+                self.stats["batches_sent"] += 1
+                self.stats["nodes_sent"] += len(self.outboxes[destination])
+                self.outboxes[destination] = list()
+
+
+def next_message(coordinator, processes):
+    """returns the next message sent to the coordinator, raises RuntimeError if a worker died instead of waiting for it
+    forever"""
+    while True:
+        try:
+            return coordinator.get(timeout=1)
+        except Empty:
+            for process in processes:
+                if process.exitcode is not None:
+                    raise RuntimeError("a worker of the parallel search stopped with exit code %d" % process.exitcode)
+
+
+def run_worker(problem, index, inboxes, coordinator, batch_size):
+    for inbox in inboxes:
+        inbox.cancel_join_thread()  # batches still on their way when the search stops are not needed
+    HdaWorker(problem, index, inboxes, coordinator, batch_size).run()
+
+
+def hda_star(problem, workers=None, batch_size=64, max_nodes=None, max_time=None, max_stored_nodes=None,
+             wave_interval=0.01):
+    """solves the problem with hash-distributed A* on workers processes (os.cpu_count() by default) and returns a
+    ParallelSearchResult. batch_size is the number of nodes a worker expands between two sends of the children it
+    generated. The budgets are the ones of search.SearchEngine, counted over all the workers, and wave_interval is the
+    time in seconds between two status requests.
+    This is a separate function and not a strategy number of search.solve: it starts its own processes, so it cannot
+    run inside the worker processes of batch.py or service.py, and the events of the search happen in the workers, so
+    there are no listeners. result.bound stays None as for every strategy but the anytime one, with an admissible
+    heuristic the solution is optimal"""
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if not problem.is_solvable() or problem.is_dead_end(problem.initial_state) is not None:
+        return ParallelSearchResult(None, "unsolvable", 0, 0, dict(), 0, time.perf_counter() - start, list())
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(workers)]
+    coordinator = context.Queue()
+    processes = [context.Process(target=run_worker, args=(problem, index, inboxes, coordinator, batch_size),
+                                 daemon=True) for index in range(workers)]
+    for process in processes:
+        process.start()
+    initial_node = Node(problem.initial_state)
+    key = problem.state_key(initial_node.state)
+    inboxes[owner(key, workers)].put(("nodes", [(key, initial_node.state, 0, heuristic(initial_node, problem), None,
+                                                 None, None)]))
+    incumbent, goal_key = float("inf"), None
+    status, previous, wave, peak_frontier = None, None, 0, 0
+    try:
+        while status is None:
+            wave += 1
+            for inbox in inboxes:
+                inbox.put(("status", wave))
+            replies = dict()
+            while len(replies) < workers:
+                message = next_message(coordinator, processes)
+                if message[0] == "goal" and message[1] < incumbent:
+                    incumbent, goal_key = message[1], message[2]
+                    for inbox in inboxes:
+                        inbox.put(("bound", incumbent))
+                elif message[0] == "status" and message[1] == wave:
+                    replies[message[2]] = message[3:]
+            counts = [replies[index][:3] for index in range(workers)]
+            expanded = sum(reply[3] for reply in replies.values())
+            stored = sum(reply[4] for reply in replies.values())
+            peak_frontier = max(peak_frontier, sum(reply[5] for reply in replies.values()))
+            """the initial node was sent by this process, it is the one batch that no worker sent"""
+            if all(count[0] for count in counts) and 1 + sum(count[1] for count in counts) \
+                    == sum(count[2] for count in counts):
+                if counts == previous:
+                    status = "solved" if goal_key is not None else "no solution"
+                    break
+                previous = counts
+            else:
+                previous = None
+            if max_nodes is not None and expanded >= max_nodes:
+                status = "node limit"
+            elif max_time is not None and time.perf_counter() - start >= max_time:
+                status = "time limit"
+            elif max_stored_nodes is not None and stored >= max_stored_nodes:
+                status = "memory limit"
+            else:
+                time.sleep(wave_interval)
+        node = None
+        if status == "solved":
+            node = rebuild_path(problem, goal_key, inboxes, coordinator, processes)
+        for inbox in inboxes:
+            inbox.put(("stop",))
+        stats = dict()
+        while len(stats) < workers:
+            message = next_message(coordinator, processes)
+            if message[0] == "stats":
+                stats[message[1]] = message[2]
+    finally:
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+    stats = [stats[index] for index in range(workers)]
+    pruned = dict()
+    for worker in stats:
+        for rule, count in worker["pruned"].items():
+            pruned[rule] = pruned.get(rule, 0) + count
+    return ParallelSearchResult(node, status, sum(worker["expanded"] for worker in stats),
+                                sum(worker["duplicates"] for worker in stats), pruned, peak_frontier,
+                                time.perf_counter() - start, stats)
+
+
+def rebuild_path(problem, goal_key, inboxes, coordinator, processes):
+    """returns the goal node with its parents up to the initial state, asking the owner of each state on the path for
+    the state it was reached from. When the state that was stored under a key is only symmetric to the one on the path,
+    the part of the path before it is mapped onto the orientation of the path (see Problem.map_path_state)"""
+    steps = list()  # (state, action) from the goal back to the initial state, the action leads to the state
+    key, target = goal_key, None
+    while key is not None:
+        inboxes[owner(key, len(inboxes))].put(("parent", key))
+        message = next_message(coordinator, processes)
+        while message[0] != "parent":
+            message = next_message(coordinator, processes)  # a goal found after the end is of no use
+        g, state, parent_key, parent_state, action = message[2]
+        if target is None:
+            target = state
+        mapping = problem.map_path_state(state, target)
+        if mapping is not None and parent_key is not None:
+            parent_state, action = mapping(parent_state, action)
+        steps.append((target, action))
+        key, target = parent_key, parent_state
+    steps.reverse()
+    return path_to_node(steps, problem)
@@ -0,0 +1,134 @@
+import mmap
+import sys
+from collections import deque
+
+"""pattern databases for the sliding puzzles. A pattern is a subset of the tiles, the database of a pattern stores for
+every placement of these tiles the number of moves of these tiles that are needed to bring them to their goal positions
+(the other tiles are treated as if they could not be told apart, moving them is free). The databases of disjoint
+patterns can be added together and the sum is still an admissible heuristic.
+A database is built once (build_pattern_database) and written to a file that has a small header followed by one byte
+per entry. The file is then opened through mmap, so all the processes that use the same file share one copy of it in
+the page cache and opening it costs almost nothing"""
+
+MAGIC = b"PDB1"
+
+
+def placement_index(positions, cells):
+    """returns the index of the placement of the pattern tiles, positions being the cells of the tiles (in the order of
+    the pattern). The placements are numbered like partial permutations: the first tile has cells choices, the second
+    one cells - 1, and so on"""
+    index = 0
+    for i in range(len(positions)):
+        rank = positions[i]
+        for j in range(i):
+            if positions[j] < positions[i]:
+                rank -= 1
+        index = index * (cells - i) + rank
+    return index
+
+
+def number_of_placements(cells, size):
+    count = 1
+    for i in range(size):
+        count *= cells - i
+    return count
+
+
+def build_pattern_database(goal, width, tiles, path):
+    """builds the database of the pattern made of the given tiles for the width x width puzzle with the given goal (a
+    list of width * width cells, 0 being the blank) and writes it to path.
+    The distances are found with a breadth-first search backward from the goal over the abstract states (the cells of
+    the pattern tiles and the cell of the blank). A move of a pattern tile costs 1 and a move of another tile costs 0, so
+    the search is a 0-1 BFS: the states reached for free are put at the front of the queue. The database keeps, for each
+    placement of the pattern tiles, the smallest distance over all the positions of the blank"""
+    cells = width * width
+    tiles = list(tiles)
+    neighbours = list()
+    for cell in range(cells):
+        row, col = int(cell / width), cell % width
+        neighbours.append([row * width + col + d_col + d_row * width
+                           for d_row, d_col in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                           if 0 <= row + d_row < width and 0 <= col + d_col < width])
+    start = tuple(goal.index(tile) for tile in tiles)
+    placements = number_of_placements(cells, len(tiles))
+    table = bytearray(b"\xff") * placements
+    expanded = bytearray(placements * cells)  # 1 for each (placement, blank) that was already taken out of the queue
+    queue = deque()
+    queue.append((start, goal.index(0), 0))
+    while queue:
+        positions, blank, cost = queue.popleft()
+        index = placement_index(positions, cells)
+        if expanded[index * cells + blank]:
+            continue
+        expanded[index * cells + blank] = 1
+        if cost < table[index]:
+            table[index] = cost
+        for cell in neighbours[blank]:
+            if cell in positions:
+                """a pattern tile slides into the blank"""
+                queue.append((tuple(blank if position == cell else position for position in positions), cell, cost + 1))
+            elif not expanded[index * cells + cell]:
+                queue.appendleft((positions, cell, cost))
+    with open(path, "wb") as file:
+        file.write(MAGIC + bytes([width, len(tiles)]) + bytes(tiles) + bytes(start))
+        file.write(table)
+
+
+class PatternDatabase:
+    """a pattern database read from a file written by build_pattern_database, the entries stay in the memory-mapped
+    file and are read from it directly"""
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != MAGIC:
+            raise ValueError("%s is not a pattern database" % path)
+        self.width = self.data[4]
+        size = self.data[5]
+        self.tiles = list(self.data[6:6 + size])
+        self.goal_positions = list(self.data[6 + size:6 + 2 * size])
+        self.offset = 6 + 2 * size
+        self.cells = self.width * self.width
+
+    def value(self, positions):
+        """positions[tile] is the cell of the tile, returns the number of moves the pattern tiles need at least"""
+        return self.data[self.offset + placement_index([positions[tile] for tile in self.tiles], self.cells)]
+
+    def matches(self, goal):
+        """returns True if the database was built for this goal (a list of cells)"""
+        goal = list(goal)
+        return len(goal) == self.cells and all(tile in goal for tile in self.tiles) \
+            and [goal.index(tile) for tile in self.tiles] == self.goal_positions
+
+    def check_goal(self, goal):
+        """raises ValueError if the database was not built for this goal (a list of cells)"""
+        if not self.matches(goal):
+            raise ValueError("the pattern database of the tiles %s was built for another goal" % self.tiles)
+
+
+def load_pattern_databases(databases, goal):
+    """returns a list of PatternDatabase from a list of file paths (or databases that are already open), after checking
+    that they were built for the goal and that their patterns do not share tiles, so their values can be added"""
+    loaded = list()
+    seen = set()
+    for database in databases:
+        if not isinstance(database, PatternDatabase):
+            database = PatternDatabase(database)
+        database.check_goal(goal)
+        if seen & set(database.tiles):
+            raise ValueError("the patterns of additive pattern databases must not share tiles")
+        seen |= set(database.tiles)
+        loaded.append(database)
+    return loaded
+
+
+if __name__ == "__main__":
+    """python pattern_database.py width tiles [tiles ...] builds one database per pattern for the puzzle of the given
+    width with the usual goal (tiles in order and the blank last). The patterns are given as tiles separated by commas,
+    e.g. python pattern_database.py 3 1,2,3,4 5,6,7,8"""
+    width = int(sys.argv[1])
+    goal = list(range(1, width * width)) + [0]
+    for pattern in sys.argv[2:]:
+        tiles = [int(tile) for tile in pattern.split(",")]
+        path = "pdb_%d_%s.bin" % (width, "-".join(str(tile) for tile in tiles))
+        build_pattern_database(goal, width, tiles, path)
+        print("Pattern database written to", path)
@@ -1,8 +1,11 @@
 from search import Node
+from pattern_database import load_pattern_databases
 
 class Problem:
     """this is the general class problem and from which we will be inheriting attributes and methods for the specific
     problem classes"""
+    check_heuristic = False  # debug mode: compare the heuristic values derived from the parent with the full computation
+
     def __init__(self, initial_state, goal=None):
         self.initial_state = initial_state
         self.goal = goal
@@ -13,6 +16,23 @@ class Problem:
     def successor_function(self, parent):
         raise NotImplementedError
 
+    def predecessor_function(self, node):
+        """returns a node for each state from which one action leads to the state of the given node (the parent of these
+        nodes is the given node and their action is the one that leads from their state to the state of the given node).
+        It is needed by the bidirectional search to search backward from the goal"""
+        raise NotImplementedError
+
+    def is_solvable(self):
+        """returns False if it is known that the goal cannot be reached from the initial state, so that the search can
+        stop right away instead of going through every reachable state. By default we do not know"""
+        return True
+
+    def is_dead_end(self, state):
+        """returns None if the goal may still be reachable from the state, otherwise the name of the rule that shows it is
+        not (the search counts the nodes pruned by each rule). Problems that know invariants of their actions override
+        it, by default no state is pruned"""
+        return None
+
     def goal_test(self, state):
         if isinstance(self.goal, list):
             return state in self.goal
@@ -24,52 +44,138 @@ class Problem:
     def heuristic_value(self, node):
         raise NotImplementedError
 
+    def child_heuristic_value(self, parent, child):
+        """returns the heuristic value of the child given the parent, whose heuristic value is already known (it is
+        cached in parent.heuristic), and the child that was generated from it by child.action. Problems where an action
+        only changes a small part of the state override it to update the value of the parent instead of computing the
+        value from scratch"""
+        return self.heuristic_value(child)
+
+    def backward_heuristic_value(self, node):
+        """estimates the cost from the initial state to the state of the node, it is used when searching backward from
+        the goal. By default it is 0, which turns the backward half of the bidirectional A* into a uniform cost search"""
+        return 0
+
+    def decode_state(self, state):
+        """returns the state in the list format that is used for input and output. Problems that keep their states in a
+        packed form internally override it, by default the state is returned as it is"""
+        return state
+
+    def decode_action(self, action):
+        """returns the action in the format that is shown to the user. Problems that use small integer codes for their
+        actions (so that the nodes do not each carry a list or a string) override it"""
+        return action
+
+    def map_path_state(self, state, target):
+        """state and target have the same key (see state_key) but they may not be equal when the key treats symmetric
+        states as the same. Returns None if they are equal, otherwise a function (state, action) -> (state, action) that
+        maps a path through state onto the corresponding path through target. It is used by the bidirectional search to
+        join two paths that met in symmetric states"""
+        return None
+
+    def state_key(self, state):
+        """returns an immutable (hashable) form of the given state. The search uses it to index the closed list and
+        the frontier, so two states that are the same must give the same key. States that are lists are turned into
+        tuples, other states are assumed to be hashable already"""
+        if isinstance(state, list):
+            return tuple(state)
+        return state
+
 
 class ProblemMissionaries(Problem):
     """this is the problem class for missionaries and cannibals"""
-    def __init__(self, initial_state, goal):
-        """the state of this problem is represented as a list that has 3 values:
+    def __init__(self, initial_state, goal, people=3, capacity=2):
+        """the state of this problem is given as a list that has 3 values:
         the first value indicated the number of missionaries on the right side
         the second value represent the number of cannibals on the right side
-        and the third value is 1 if the boat is at the right side and 0 if it is at the left side"""
-        super().__init__(initial_state, goal)
+        and the third value is 1 if the boat is at the right side and 0 if it is at the left side
+        people is the number of missionaries (and the number of cannibals) and capacity is the number of seats of the
+        boat, the usual puzzle has 3 of each and 2 seats.
+        Internally a state is packed into the integer missionaries << 2 * bits | cannibals << bits | boat (bits is 8
+        unless there are more than 255 people), and an action is the index of the corresponding list in actions()"""
+        self.people = people
+        self.capacity = capacity
+        self.bits = max(8, people.bit_length())
+        self.count_mask = (1 << self.bits) - 1
+        super().__init__(self.encode_state(initial_state), self.encode_state(goal))
+        self.possible_actions = self.actions()
+        """the change that each action makes to a packed state (it is subtracted when the boat leaves the right side
+        and added when it comes back), listed in the order in which the successors are generated"""
+        self.moves = [(action[0], action[1], action[0] << 2 * self.bits | action[1] << self.bits | action[2], code)
+                      for code, action in reversed(list(enumerate(self.possible_actions)))]
+        """the legal children of each state are found the first time the state is expanded and kept in transitions
+        (state -> list of (child state, action)), so the successor function only copies them into new nodes"""
+        self.transitions = dict()
+        """the states from which the goal can be reached, found once with a breadth-first search backward from the goal
+        (the state space only has 2 * (people + 1) ** 2 states)"""
+        self.can_reach_goal = {self.goal}
+        queue = [Node(self.goal)]
+        while queue:
+            node = queue.pop()
+            for predecessor in self.predecessor_function(node):
+                if predecessor.state not in self.can_reach_goal:
+                    self.can_reach_goal.add(predecessor.state)
+                    queue.append(predecessor)
 
     def actions(self):
-        """this function returns the set of all actions available"""
-        possible_actions = [[1, 0, 1], [0, 1, 1], [1, 1, 1], [2, 0, 1], [0, 2, 1]]
+        """this function returns the set of all actions available: every load of the boat that has at least one person,
+        at most capacity people and where the missionaries on the boat are not outnumbered by the cannibals. The loads
+        are listed by their size and for the same size the most balanced ones first, which gives the order of our first
+        version for 3 people and 2 seats: [1, 0, 1], [0, 1, 1], [1, 1, 1], [2, 0, 1], [0, 2, 1]"""
+        loads = [[m, c, 1] for m in range(self.capacity + 1) for c in range(self.capacity + 1)
+                 if 1 <= m + c <= self.capacity and (m == 0 or m >= c)]
+        possible_actions = sorted(loads, key=lambda load: (load[0] + load[1], abs(load[0] - load[1]), -load[0]))
         return possible_actions
 
+    def encode_state(self, state):
+        return state[0] << 2 * self.bits | state[1] << self.bits | state[2]
+
+    def decode_state(self, state):
+        return [state >> 2 * self.bits, state >> self.bits & self.count_mask, state & 1]
+
+    def decode_action(self, action):
+        return self.possible_actions[action]
+
     def successor_function(self, parent):
+        """the children of the state are taken from transitions, they are computed by state_moves the first time"""
+        state = parent.state
+        moves = self.transitions.get(state)
+        if moves is None:
+            moves = self.transitions[state] = self.state_moves(state)
         successors = list()
-        all_actions = self.actions()
-        if parent.state[2] == 1:
-            """if the boat is the on right side we perform the actions by decreasing the the number of missionaries 
-            and cannibals from the given state (which means that we transfer a number of people from the right side to 
-            the left side"""
-            for i in range(5):
-                action = all_actions.pop()
-                result = [parent.state[0] - action[0], parent.state[1] - action[1], parent.state[2] - action[2]]
-                child = Node(result, parent, action)
-                successors.append(child)
-        if parent.state[2] == 0:
-            """if the boat is the on right side we perform the actions by increasing the the number of missionaries 
-            and cannibals from the given state (which means that we transfer a number of people from the left side to 
-            the right side"""
-            for i in range(5):
-                action = all_actions.pop()
-                result = [parent.state[0] + action[0], parent.state[1] + action[1], parent.state[2] + action[2]]
-                child = Node(result, parent, action)
-                successors.append(child)
-        legal_successors = list()
-        for new_node in successors:
-            """in this loop we check for illegal states so that we can eliminate them. The checking is basically done by 
-            checking if that both the number of missionaries and cannibals should be between 0 and 3 and then for the
-            state to be considered legal the number of missionaries must be either 0 or 3 and if it is not the case it 
-            should be equal to the number of missionaries"""
-            if 0 <= new_node.state[0] <= 3 and 0 <= new_node.state[1] <= 3:
-                if (new_node.state[0] == 3 or new_node.state[0] == 0) or (new_node.state[0] == new_node.state[1]):
-                    legal_successors.append(new_node)
-        return legal_successors
+        for child, action in moves:
+            successors.append(Node(child, parent, action))
+        return successors
+
+    def state_moves(self, state):
+        """if the boat is on the right side we perform the actions by decreasing the number of missionaries and
+        cannibals from the given state (which means that we transfer a number of people from the right side to the
+        left side), otherwise we increase them.
+        Then we check for illegal states so that we can eliminate them: both the number of missionaries and cannibals
+        should be between 0 and people and for the state to be considered legal the number of missionaries must be
+        either 0 or people and if it is not the case it should be equal to the number of cannibals (otherwise the
+        missionaries are outnumbered on one of the sides)"""
+        moves = list()
+        people = self.people
+        missionaries, cannibals = state >> 2 * self.bits, state >> self.bits & self.count_mask
+        sign = -1 if state & 1 else 1
+        for moved_missionaries, moved_cannibals, change, action in self.moves:
+            m, c = missionaries + sign * moved_missionaries, cannibals + sign * moved_cannibals
+            if 0 <= m <= people and 0 <= c <= people and (m == people or m == 0 or m == c):
+                moves.append((state + sign * change, action))
+        return moves
+
+    def predecessor_function(self, node):
+        """an action that takes the boat across can be undone by the same action taking the boat back, so the states that
+        lead to a state are its successors, with the same actions"""
+        return self.successor_function(node)
+
+    def is_dead_end(self, state):
+        """a state from which no sequence of crossings reaches the goal, e.g. the boat is on a side where nobody is left
+        to take it back"""
+        if state not in self.can_reach_goal:
+            return "goal not reachable"
+        return None
 
     def goal_test(self, state):
         return state == self.goal
@@ -80,160 +186,264 @@ class ProblemMissionaries(Problem):
 
     def heuristic_value(self, node):
         """the successor function we used returns the number of people on the right side"""
-        return (node.state[0] + node.state[1]) - 1
+        return (node.state >> 2 * self.bits) + (node.state >> self.bits & self.count_mask) - 1
+
+    def child_heuristic_value(self, parent, child):
+        """the action moves some missionaries and cannibals to the side where the boat goes"""
+        action = self.possible_actions[child.action]
+        if parent.state & 1:
+            return parent.heuristic - action[0] - action[1]
+        return parent.heuristic + action[0] + action[1]
 
 class PegProblem(Problem):
     """this the problem class for the peg solitaire problem"""
-    def __init__(self, initial_state, goal):
-        """the states in this problem are represented with a list, i.e. we kind of flattened the space from 2D list to a
-         1D list that has 49 locations (cells). Each location has one of the following values: 0, 1, or 2.
+    def __init__(self, initial_state, goal, symmetry=True, width=7):
+        """the states in this problem are given as a list, i.e. we kind of flattened the space from 2D list to a 1D list
+        that has 49 locations (cells) for the usual 7x7 square, or width * height cells for other boards. Each location
+        has one of the following values: 0, 1, or 2.
         0 means that there is no peg and the corresponding location corresponds to a location on the board.
         1 means that there is a peg on that location
-        and 2 means that the corresponding location is not the part of board"""
-        super().__init__(initial_state, goal)
+        and 2 means that the corresponding location is not the part of board
+        so the 2s give the shape of the board (its mask) and any shape that fits in the rectangle can be played.
+        Internally a state is packed into an integer where bit i is set if there is a peg on cell i (bitboard), and the
+        cells that are part of the board are kept in self.board. The jump tables are computed once here so that the
+        successor function only needs a couple of shifts and ANDs per direction, whatever the size of the board.
+        If symmetry is set, the boards that are rotations or reflections of each other are treated as the same state
+        by the search (see state_key)"""
+        self.width = width
+        self.cells = len(initial_state)
+        self.height = int(self.cells / width)
+        if self.width * self.height != self.cells or len(goal) != self.cells:
+            raise ValueError("a peg solitaire board needs width * height cells")
+        self.board = 0
+        for i in range(self.cells):
+            if initial_state[i] != 2:
+                self.board |= 1 << i
+        super().__init__(self.encode_state(initial_state), self.encode_state(goal))
+        """a jump moves a peg by 2 * step cells, the step being -width (up), -1 (left), width (down) or 1 (right). For
+        each direction we keep (step, mask of the cells a peg can jump from in that direction). For each cell we keep the
+        jumps that start from it as (direction, the three cells that change, action). The action is the index of the
+        jump in self.jump_actions, which has [row, column] of the jumping peg and [row, column] of the peg it jumps
+        over. The jumps of a cell are listed in the same order
+        as in our first version of the successor function so that DFS still explores the board in the same order"""
+        moves = {"up": (-1, 0), "left": (0, -1), "down": (1, 0), "right": (0, 1)}
+        names = list(moves)
+        origins = dict((name, 0) for name in names)
+        self.cell_jumps = [list() for i in range(self.cells)]
+        self.jump_actions = list()
+        for i in range(self.cells):
+            row, col = int(i / width), i % width
+            if row < 2:
+                order = ["down", "left", "right"]
+            elif row > self.height - 3:
+                order = ["up", "left", "right"]
+            elif col < 2:
+                order = ["up", "right", "down"]
+            elif col > width - 3:
+                order = ["up", "left", "down"]
+            else:
+                order = ["up", "left", "down", "right"]
+            for name in order:
+                d_row, d_col = moves[name]
+                if not (0 <= row + 2 * d_row < self.height and 0 <= col + 2 * d_col < width):
+                    continue
+                step = width * d_row + d_col
+                if self.board >> i & 1 and self.board >> (i + step) & 1 and self.board >> (i + 2 * step) & 1:
+                    origins[name] |= 1 << i
+                    flip = (1 << i) | (1 << (i + step)) | (1 << (i + 2 * step))
+                    self.cell_jumps[i].append((names.index(name), flip, len(self.jump_actions)))
+                    self.jump_actions.append([row, col, row + d_row, col + d_col])
+        self.directions = [(width * moves[name][0] + moves[name][1], origins[name]) for name in names]
+        # masks used to drop the pegs that wrap around to the other side of the board when shifting by one column
+        self.not_first_column = 0
+        self.not_last_column = 0
+        for i in range(self.cells):
+            if i % width != 0:
+                self.not_first_column |= 1 << i
+            if i % width != width - 1:
+                self.not_last_column |= 1 << i
+        self.symmetries = self.board_symmetries() if symmetry else list()
+        """the masks used by is_dead_end and is_solvable (see there)"""
+        self.goal_pegs = self.goal.bit_count()
+        self.resources = list()
+        for row_parity in range(2):
+            for col_parity in range(2):
+                mask = 0
+                for i in range(self.cells):
+                    if int(i / width) % 2 == row_parity and i % width % 2 == col_parity:
+                        mask |= 1 << i
+                mask &= self.board
+                if self.goal & mask:
+                    self.resources.append((mask, (self.goal & mask).bit_count()))
+        self.colorings = list()
+        for color_of in (lambda row, col: (row + col) % 3, lambda row, col: (row - col) % 3):
+            masks = [0, 0, 0]
+            for i in range(self.cells):
+                masks[color_of(int(i / width), i % width)] |= 1 << i
+            self.colorings.append(masks)
+
+    def board_symmetries(self):
+        """returns the rotations and reflections of the rectangle (other than the identity) that map the board and the
+        goal onto themselves, the rotations by a quarter turn and the reflections on the diagonals only exist if the
+        rectangle is a square. Two boards that are mapped onto each other by one of them have the same distance to the
+        goal. Each symmetry is kept as (lookup tables, image of each action): the cells are cut into 7 chunks of
+        self.chunk consecutive cells (one row of the 7x7 board) and the lookup table of a chunk gives for each way to
+        fill its cells the bits they become, so a whole board is transformed with 7 lookups. The tables grow as
+        2 ** self.chunk, so boards of more than 84 cells are searched without symmetries"""
+        self.chunk = -(-self.cells // 7)
+        self.chunk_mask = (1 << self.chunk) - 1
+        if self.chunk > 12:
+            return list()
+        last_row, last_col = self.height - 1, self.width - 1
+        transforms = [lambda row, col: (last_row - row, last_col - col), lambda row, col: (row, last_col - col),
+                      lambda row, col: (last_row - row, col)]
+        if self.width == self.height:
+            transforms = [lambda row, col: (col, last_row - row), transforms[0], lambda row, col: (last_col - col, row),
+                          transforms[1], transforms[2], lambda row, col: (col, row),
+                          lambda row, col: (last_col - col, last_row - row)]
+        symmetries = list()
+        jump_codes = dict((tuple(action), code) for code, action in enumerate(self.jump_actions))
+        for transform in transforms:
+            cells = list()
+            for i in range(self.cells):
+                row, col = transform(int(i / self.width), i % self.width)
+                cells.append(self.width * row + col)
+            tables = [[sum(1 << cells[self.chunk * chunk + bit] for bit in range(self.chunk)
+                           if value >> bit & 1 and self.chunk * chunk + bit < self.cells)
+                       for value in range(1 << self.chunk)] for chunk in range(7)]
+            symmetry = (tables, None)
+            if self.apply_symmetry(self.board, symmetry) != self.board or self.apply_symmetry(self.goal, symmetry) != self.goal:
+                continue
+            actions = list()
+            for row, col, over_row, over_col in self.jump_actions:
+                row, col = transform(row, col)
+                over_row, over_col = transform(over_row, over_col)
+                actions.append(jump_codes[(row, col, over_row, over_col)])
+            symmetries.append((tables, actions))
+        return symmetries
+
+    def apply_symmetry(self, state, symmetry):
+        tables, chunk, mask = symmetry[0], self.chunk, self.chunk_mask
+        return tables[0][state & mask] | tables[1][state >> chunk & mask] | tables[2][state >> 2 * chunk & mask] \
+            | tables[3][state >> 3 * chunk & mask] | tables[4][state >> 4 * chunk & mask] \
+            | tables[5][state >> 5 * chunk & mask] | tables[6][state >> 6 * chunk]
+
+    def state_key(self, state):
+        """the key of a board is the smallest of the integers of the board and of its images by the symmetries, so all the
+        boards that are rotations or reflections of each other share one entry in the closed list and the frontier.
+        The nodes still keep the boards as they were reached, so the solution path needs no change"""
+        key = state
+        if not self.symmetries:
+            return key
+        chunk, mask = self.chunk, self.chunk_mask
+        row0, row1, row2 = state & mask, state >> chunk & mask, state >> 2 * chunk & mask
+        row3, row4, row5 = state >> 3 * chunk & mask, state >> 4 * chunk & mask, state >> 5 * chunk & mask
+        row6 = state >> 6 * chunk
+        for (rows0, rows1, rows2, rows3, rows4, rows5, rows6), actions in self.symmetries:
+            image = rows0[row0] | rows1[row1] | rows2[row2] | rows3[row3] | rows4[row4] | rows5[row5] | rows6[row6]
+            if image < key:
+                key = image
+        return key
+
+    def map_path_state(self, state, target):
+        """returns a function that maps the states and actions of a path onto the orientation of target, for a state that
+        has the same key as target (see join_paths), or None if the state is already target"""
+        if state == target:
+            return None
+        for symmetry in self.symmetries:
+            if self.apply_symmetry(state, symmetry) == target:
+                return lambda state, action: (self.apply_symmetry(state, symmetry), symmetry[1][action])
+        raise ValueError("the two boards are not symmetric")
+
+    def encode_state(self, state):
+        """packs a state given as a list of cells into the integer used internally"""
+        packed = 0
+        for i in range(len(state)):
+            if state[i] == 1:
+                packed |= 1 << i
+        return packed
+
+    def decode_state(self, state):
+        """unpacks an integer state back to the list of cells (0 empty, 1 peg, 2 not part of the board)"""
+        return [(1 if state >> i & 1 else 0) if self.board >> i & 1 else 2 for i in range(self.cells)]
+
+    def decode_action(self, action):
+        return self.jump_actions[action]
 
     def successor_function(self, parent):
+        """a jump is legal if the jumping peg and the peg it jumps over are there and the landing cell is empty. For each
+        direction the pegs that can jump are found all at once by shifting the board (the peg over and the landing cell
+        are shifted back onto the cell of the jumping peg), then each child is obtained by flipping its three cells"""
         successors = list()
-        result = parent.state.copy()
-        for i in range(49):
-            if parent.state[i] == 1:
-                """the successor function starts by checking for pegs one at a time"""
-                if (i / 7) < 2: #if the peg is in the first 2 rows, i.e. it cannot jump over a peg that is above it(if exists)
-                    if parent.state[i + 14] == 0:  #if the location that is below the below location of our peg is empty
-                        if parent.state[i + 7] == 1: #if the location that is below our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 7] = 0
-                            result[i + 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) + 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i - 2] == 0: #if the location that is left to the left location of our peg is empty
-                        if parent.state[i - 1] == 1: #if the location that is left to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 1] = 0
-                            result[i - 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) - 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 2] == 0:  #if the location that is right ro the right location of our peg is empty
-                        if parent.state[i + 1] == 1: #if the location that is right to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 1] = 0
-                            result[i + 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) + 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                if int(i / 7) > 4: #if the peg is in the last 2 rows, i.e. it cannot jump over a peg that is below it(if exists)
-                    if parent.state[i - 14] == 0: #if the location that is above the above location of our peg is empty
-                        if parent.state[i - 7] == 1:  #if the location that is above our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 7] = 0
-                            result[i - 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) - 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i - 2] == 0: #if the location that is left to the left location of our peg is empty
-                        if parent.state[i - 1] == 1: #if the location that is left to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 1] = 0
-                            result[i - 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) - 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 2] == 0:  #if the location that is right ro the right location of our peg is empty
-                        if parent.state[i + 1] == 1: #if the location that is right to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 1] = 0
-                            result[i + 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) + 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                if (i % 7) < 2:
-                    if parent.state[i - 14] == 0:  #if the location that is above the above location of our peg is empty
-                        if parent.state[i - 7] == 1:  #if the location that is above our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 7] = 0
-                            result[i - 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) - 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 2] == 0:  #if the location that is right ro the right location of our peg is empty
-                        if parent.state[i + 1] == 1: #if the location that is right to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 1] = 0
-                            result[i + 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) + 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 14] == 0:  #if the location that is below the below location of our peg is empty
-                        if parent.state[i + 7] == 1: #if the location that is below our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 7] = 0
-                            result[i + 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) + 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                if (i % 7) > 4:
-                    if parent.state[i - 14] == 0:  #if the location that is above the above location of our peg is empty
-                        if parent.state[i - 7] == 1:  #if the location that is above our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 7] = 0
-                            result[i - 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) - 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i - 2] == 0: #if the location that is left to the left location of our peg is empty
-                        if parent.state[i - 1] == 1: #if the location that is left to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 1] = 0
-                            result[i - 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) - 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 14] == 0:  #if the location that is below the below location of our peg is empty
-                        if parent.state[i + 7] == 1: #if the location that is below our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 7] = 0
-                            result[i + 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) + 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                elif (2 <= int(i / 7) <= 4) and (2 <= i % 7 <= 4):
-                    if parent.state[i - 14] == 0:  #if the location that is above the above location of our peg is empty
-                        if parent.state[i - 7] == 1:  #if the location that is above our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 7] = 0
-                            result[i - 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) - 1, i % 7])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i - 2] == 0: #if the location that is left to the left location of our peg is empty
-                        if parent.state[i - 1] == 1: #if the location that is left to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i - 1] = 0
-                            result[i - 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) - 1])
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 14] == 0:  #if the location that is below the below location of our peg is empty
-                        if parent.state[i + 7] == 1: #if the location that is below our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 7] = 0
-                            result[i + 14] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7) + 1, i % 7])
-                            print(child.parent.state)
-                            successors.append(child)
-                            result = parent.state.copy()
-                    if parent.state[i + 2] == 0:  #if the location that is right ro the right location of our peg is empty
-                        if parent.state[i + 1] == 1: #if the location that is right to our peg has a peg then we jump over it
-                            result[i] = 0
-                            result[i + 1] = 0
-                            result[i + 2] = 1
-                            child = Node(result, parent, [int(i / 7), i % 7, int(i / 7), (i % 7) + 1])
-                            successors.append(child)
-                            result = parent.state.copy()
+        state = parent.state
+        empty = self.board & ~state
+        movable = list()
+        for step, origins in self.directions:
+            if step > 0:
+                movable.append(state & (state >> step) & (empty >> 2 * step) & origins)
+            else:
+                movable.append(state & (state << -step) & (empty << -2 * step) & origins)
+        pegs = movable[0] | movable[1] | movable[2] | movable[3]
+        while pegs:
+            peg = pegs & -pegs  # lowest peg that can jump
+            pegs ^= peg
+            for direction, flip, action in self.cell_jumps[peg.bit_length() - 1]:
+                if movable[direction] & peg:
+                    successors.append(Node(state ^ flip, parent, action))
         return successors
 
+    def predecessor_function(self, node):
+        """the predecessors are found by undoing jumps: a jump could have led to this state if the cell it starts from
+        and the cell it jumps over are empty and its landing cell has a peg. They are found the same way as in the
+        successor function with the roles of the pegs and the empty cells swapped"""
+        predecessors = list()
+        state = node.state
+        empty = self.board & ~state
+        movable = list()
+        for step, origins in self.directions:
+            if step > 0:
+                movable.append(empty & (empty >> step) & (state >> 2 * step) & origins)
+            else:
+                movable.append(empty & (empty << -step) & (state << -2 * step) & origins)
+        cells = movable[0] | movable[1] | movable[2] | movable[3]
+        while cells:
+            cell = cells & -cells
+            cells ^= cell
+            for direction, flip, action in self.cell_jumps[cell.bit_length() - 1]:
+                if movable[direction] & cell:
+                    predecessors.append(Node(state ^ flip, node, action))
+        return predecessors
+
+    def is_dead_end(self, state):
+        """every jump removes one peg, so a board that is not the goal and does not have more pegs than the goal can no
+        longer reach it (peg count).
+        A jumping peg moves by two cells, so it stays in the same class of cells, the class being the parity of the row
+        and the parity of the column. Only the peg that is jumped over leaves its class, so the number of pegs in a class
+        never goes up and a board with fewer pegs than the goal in one of the classes is a dead end (resource count, the
+        classes are the simplest of Conway's resource counts and are valid on any board)"""
+        pegs = state.bit_count()
+        if pegs <= self.goal_pegs and state != self.goal:
+            return "peg count"
+        for mask, needed in self.resources:
+            if (state & mask).bit_count() < needed:
+                return "resource count"
+        return None
+
+    def is_solvable(self):
+        """the cells are colored with 3 colors along the diagonals, so that any 3 cells in a row or a column have the 3
+        colors. A jump empties two of the colors by one peg and adds one peg to the third, so the parity of the number of
+        pegs of each color changes and the parity of the sum of two colors does not. Doing it for both directions of the
+        diagonals gives the position class of Conway, it never changes and the goal can only be reached if it has the
+        same class as the initial state. It is checked once here since every child has the class of its parent"""
+        return self.position_class(self.initial_state) == self.position_class(self.goal)
+
+    def position_class(self, state):
+        position_class = list()
+        for masks in self.colorings:
+            counts = [(state & mask).bit_count() for mask in masks]
+            position_class.append(((counts[0] + counts[1]) % 2, (counts[1] + counts[2]) % 2))
+        return position_class
+
     def goal_test(self, state):
         return state == self.goal
 
@@ -242,95 +452,129 @@ class PegProblem(Problem):
         return c
 
     def heuristic_value(self, node):
-        #The manhattan distance heuristic is fully functional, and we decided to disregard it because it hindered the performance of A* and Greedy Best first Search
-        #we tried Manhattan distance but it always overestimates the distance to the goal
-        """man_dis = 0
-        index = node.state.index(1)
-        for i in range(49):
-            if node.state[i] == 1:
-                man_dis = man_dis + abs(int(i / 7) - int(index / 7)) + abs((i % 7) - (index % 7))
-        man_dis_cen = 0
-        for i in range(49):
-            if node.state[i] == 1:
-                vertical_distance = abs(int(i / 7) - 3)
-                horizontal_distance = abs((i % 7) - 3)
-                man_dis_cen = man_dis_cen + vertical_distance + horizontal_distance
-        total = (man_dis + man_dis_cen) / 2""" 
-        number_isolated_pegs = 0
-        """our heuristic function computes the number of isolated pegs"""
-        for i in range(49):
-            if node.state[i] == 1:
-                if 2 <= i <= 4:
-                    if not (node.state[i + 1] == 1 or node.state[i - 1] == 1 or node.state[i + 7] == 1):
-                        number_isolated_pegs += 1
-                elif i == 14 or i == 21 or i == 28:
-                    if not (node.state[i + 1] == 1 or node.state[i + 7] == 1 or node.state[i - 7] == 1):
-                        number_isolated_pegs += 1
-                elif i == 20 or i == 27 or i == 34:
-                    if not (node.state[i - 1] == 1 or node.state[i + 7] == 1 or node.state[i - 7] == 1):
-                        number_isolated_pegs += 1
-                elif 44 <= i <= 46:
-                    if not (node.state[i - 1] == 1 or node.state[i - 7] == 1 or node.state[i + 1] == 1):
-                        number_isolated_pegs += 1
-                else:
-                    if not (node.state[i - 1] == 1 or node.state[i + 1] == 1 or node.state[i + 7] == 1 or node.state[i - 7] == 1):
-                        number_isolated_pegs += 1
-        return number_isolated_pegs
-
-class Eight_PuzzleProblem(Problem):
-    """this is the class problem for 8 puzzle"""
-    def __init__(self, initial_state, goal):
-        """the states are represented using a list that has 9 cells, each cell has the number of the tile and the blank
-        tile is represented with 0"""
-        super().__init__(initial_state, goal)
+        #we tried Manhattan distance but it always overestimates the distance to the goal, and it hindered the
+        #performance of A* and Greedy Best first Search
+        """our heuristic function computes the number of isolated pegs, i.e. pegs that have no peg next to them
+        (above, below, left or right). The neighbours of all the pegs are found at once by shifting the board. This is
+        already a handful of operations on one integer, updating it from the parent would need the same operations on
+        both boards, so this class keeps the default child_heuristic_value"""
+        state = node.state
+        neighbours = ((state << 1) & self.not_first_column) | ((state >> 1) & self.not_last_column) \
+            | (state << self.width) | (state >> self.width)
+        return (state & ~neighbours).bit_count()
+
+class SlidingPuzzleProblem(Problem):
+    """this is the class problem for the sliding puzzles of any size (8-puzzle, 15-puzzle, 24-puzzle, ...)"""
+    def __init__(self, initial_state, goal, pattern_databases=None):
+        """the states are given using a list that has width * width cells, each cell has the number of the tile and the
+        blank tile is represented with 0. Internally a state is packed into an integer: the tile of cell i is kept in
+        self.bits bits from bit self.bits * i (4 bits are enough up to the 15-puzzle, the 24-puzzle needs 5) and the
+        position of the blank is kept above them, so that it does not have to be searched for. The moves of the blank and
+        the heuristic distances are computed once here, so expanding a node costs the same whatever the size.
+        pattern_databases is an optional list of files (or PatternDatabase) of disjoint patterns built for this goal
+        (see pattern_database.py), if it is given the heuristic is the sum of their values instead of our modified
+        Manhattan distance"""
+        self.cells = len(initial_state)
+        self.width = int(round(self.cells ** 0.5))
+        if self.width * self.width != self.cells or len(goal) != self.cells:
+            raise ValueError("a sliding puzzle needs width * width cells")
+        self.bits = max(4, (self.cells - 1).bit_length())
+        self.tile_mask = (1 << self.bits) - 1
+        self.blank_shift = self.bits * self.cells
+        super().__init__(self.encode_state(initial_state), self.encode_state(goal))
+        self.pattern_databases = None
+        if pattern_databases:
+            self.pattern_databases = load_pattern_databases(pattern_databases, goal)
+        self.action_names = ["up", "down", "left", "right"]  # an action is the index of its name in this list
+        """for each position of the blank, the moves it can make in the order up, down, left, right. A move is kept as
+        (shift of the cell the blank moves to, what to multiply the moved tile by, change of the blank position, action)
+        so that the child is just state + tile * multiplier + blank change"""
+        width, bits = self.width, self.bits
+        self.neighbours = list()
+        for blank in range(self.cells):
+            cells = list()
+            if blank >= width:
+                cells.append((blank - width, "up"))
+            if blank < self.cells - width:
+                cells.append((blank + width, "down"))
+            if blank % width != 0:
+                cells.append((blank - 1, "left"))
+            if blank % width != width - 1:
+                cells.append((blank + 1, "right"))
+            self.neighbours.append([(bits * cell, (1 << bits * blank) - (1 << bits * cell),
+                                     (cell - blank) << self.blank_shift, self.action_names.index(action))
+                                    for cell, action in cells])
+        """distance[tile][cell] is the heuristic cost of having the tile on the cell (see heuristic_value), computed from
+        the positions of the tiles in the goal. start_distance is the same towards the initial state, it is used when
+        searching backward from the goal. With pattern databases the backward side has to be admissible too, otherwise
+        bidirectional A* is not optimal anymore, so start_distance is then the real Manhattan distance"""
+        self.distance = self.distance_table(goal)
+        self.start_distance = self.distance_table(initial_state, manhattan=bool(self.pattern_databases))
+
+    def distance_table(self, target, manhattan=False):
+        width = self.width
+        target_position = [0] * self.cells
+        for cell in range(self.cells):
+            target_position[target[cell]] = cell
+        if manhattan:
+            return [[abs(int(cell / width) - int(target_position[tile] / width))
+                     + abs(cell % width - target_position[tile] % width)
+                     if tile else 0 for cell in range(self.cells)] for tile in range(self.cells)]
+        return [[2 * max(abs(int(cell / width) - int(target_position[tile] / width)),
+                         abs(cell % width - target_position[tile] % width))
+                 if tile else 0 for cell in range(self.cells)] for tile in range(self.cells)]
+
+    def is_solvable(self):
+        """a move of the blank either keeps the order of the tiles (left and right) or moves a tile over width - 1 others
+        (up and down). With an odd width the parity of the number of inversions (pairs of tiles that are in the wrong
+        order, the blank is not counted) never changes. With an even width an up or down move changes it and also moves
+        the blank to the next row, so the parity of the inversions plus the row of the blank never changes. The goal can
+        only be reached if the initial state has the same parity"""
+        return self.parity(self.decode_state(self.initial_state)) == self.parity(self.decode_state(self.goal))
+
+    def parity(self, state):
+        if self.width % 2:
+            return self.inversions(state) % 2
+        return (self.inversions(state) + int(state.index(0) / self.width)) % 2
+
+    def inversions(self, state):
+        tiles = [tile for tile in state if tile]
+        return sum(1 for i in range(len(tiles)) for j in range(i + 1, len(tiles)) if tiles[i] > tiles[j])
+
+    def encode_state(self, state):
+        """packs a state given as a list of cells into the integer used internally"""
+        packed = state.index(0) << self.bits * len(state)
+        for i in range(len(state)):
+            packed |= state[i] << self.bits * i
+        return packed
+
+    def decode_state(self, state):
+        """unpacks an integer state back to the list of cells"""
+        return [state >> self.bits * i & self.tile_mask for i in range(self.cells)]
+
+    def decode_action(self, action):
+        return self.action_names[action]
 
     def successor_function(self, parent):
-        """the successor function starts with all the states and perform some checkings to eliminate actions that will
-        yield to illegal states"""
+        """the blank is swapped with each of the cells it can move to (taken from the precomputed table), the tile that
+        was in that cell takes the place of the blank"""
         successors = list()
-        possible_actions = ["up", "down", "left", "right"]
-        index_blank = parent.state.index(0)
-        result = parent.state.copy()
-        if index_blank % 3 == 0: #if the blank is at the left (cell 0 3 or 6) we remove left action
-            possible_actions.remove("left")
-        if index_blank % 3 == 2:#if the blank is at the right (cell 2 5 or 7) we remove right action
-            possible_actions.remove("right")
-        if index_blank < 3: #if the blank is in the upper side (cell 0 1 or 2) we remove up action
-            possible_actions.remove("up")
-        if index_blank > 5: #if the blank is in the lower side (cell 6 7 or 8) we remove down action
-            possible_actions.remove("down")
-        for action in possible_actions:
-            """in this loop we perform the remaining actions after eliminating actions that will generate illegal states"""
-            if action == "up":
-                temp = parent.state[index_blank]
-                result[index_blank] = parent.state[index_blank - 3]
-                result[index_blank - 3] = temp
-                child = Node(result, parent, action)
-                successors.append(child)
-                result = parent.state.copy()
-            if action == "down":
-                temp = parent.state[index_blank]
-                result[index_blank] = parent.state[index_blank + 3]
-                result[index_blank + 3] = temp
-                child = Node(result, parent, action)
-                successors.append(child)
-                result = parent.state.copy()
-            if action == "left":
-                temp = parent.state[index_blank]
-                result[index_blank] = parent.state[index_blank - 1]
-                result[index_blank - 1] = temp
-                child = Node(result, parent, action)
-                successors.append(child)
-                result = parent.state.copy()
-            if action == "right":
-                temp = parent.state[index_blank]
-                result[index_blank] = parent.state[index_blank + 1]
-                result[index_blank + 1] = temp
-                child = Node(result, parent, action)
-                successors.append(child)
-                result = parent.state.copy()
+        state = parent.state
+        tile_mask = self.tile_mask
+        for shift, multiplier, blank_change, action in self.neighbours[state >> self.blank_shift]:
+            successors.append(Node(state + (state >> shift & tile_mask) * multiplier + blank_change, parent, action))
         return successors
 
+    def predecessor_function(self, node):
+        """a move of the blank is undone by the opposite move, so the predecessors are the same states as the successors
+        but the action that leads back is the opposite one (up and down are 0 and 1, left and right are 2 and 3)"""
+        predecessors = list()
+        state = node.state
+        tile_mask = self.tile_mask
+        for shift, multiplier, blank_change, action in self.neighbours[state >> self.blank_shift]:
+            predecessors.append(Node(state + (state >> shift & tile_mask) * multiplier + blank_change, node, action ^ 1))
+        return predecessors
+
     def goal_test(self, state):
         return state == self.goal
 
@@ -338,11 +582,42 @@ class Eight_PuzzleProblem(Problem):
         c += 1
         return c
     def heuristic_value(self, node):
+        """"our heuristic is a modified 'Manhattan Distance' in the sense that instead of adding the horizontal and
+        vertical distances of a cell between its current position and the goal position, it doubles the maxium value.
+        If pattern databases were given the heuristic is the sum of their values, which is admissible"""
+        if self.pattern_databases:
+            state = node.state
+            positions = [0] * self.cells
+            for cell in range(self.cells):
+                positions[state >> self.bits * cell & self.tile_mask] = cell
+            value = 0
+            for database in self.pattern_databases:
+                value += database.value(positions)
+            return value
+        return self.table_value(node.state, self.distance)
+
+    def backward_heuristic_value(self, node):
+        return self.table_value(node.state, self.start_distance)
+
+    def table_value(self, state, distance):
         value = 0
-        """"our heuristic is a modified 'Manhattan Distance' in the sense that instead of adding the horizontal and 
-        vertical distances of a cell between its current position and the goal position, it doubles the maxium value"""
-        for i in range(8):
-            horizontal_distance = abs((node.state.index(i+1)) % 3 - (self.goal.index(i+1)) % 3)
-            vertical_distance = abs(int((node.state.index(i+1)) / 3) - int((self.goal.index(i+1)) / 3))
-            value = value + 2 * max(vertical_distance, horizontal_distance)
+        for cell in range(self.cells):
+            value += distance[state >> self.bits * cell & self.tile_mask][cell]
         return value
+
+    def child_heuristic_value(self, parent, child):
+        """only the tile that was moved changes its cost: it moved from the new position of the blank to the old one"""
+        if self.pattern_databases:
+            return self.heuristic_value(child)
+        blank = parent.state >> self.blank_shift
+        cell = child.state >> self.blank_shift
+        tile = child.state >> self.bits * blank & self.tile_mask
+        return parent.heuristic - self.distance[tile][cell] + self.distance[tile][blank]
+
+class Eight_PuzzleProblem(SlidingPuzzleProblem):
+    """this is the class problem for 8 puzzle, the 3x3 sliding puzzle. It is kept as its own class since the exact
+    distance table (strategy 9, see distance_table.py) only exists for this size"""
+    def __init__(self, initial_state, goal, pattern_databases=None):
+        if len(initial_state) != 9:
+            raise ValueError("the 8-puzzle has 9 cells, use SlidingPuzzleProblem for the other sizes")
+        super().__init__(initial_state, goal, pattern_databases)
@@ -1,6 +1,7 @@
-closed_list = list()
-number_expanded_nodes = 0
-number_loops = 0
+import time
+from collections import deque
+from heapq import heappush, heappop
+
 """As specified in class, the Node class is merely a data-structure, it is independent from problem-specific logic, 
 therefore, it is used for all the problems. 
 """
@@ -8,13 +9,17 @@ class Node:
     """class Node takes as arguments a state and if the state given does not correspond to the initial state, the parent
     and the action that lead to the generation of the node are also given as inputs. If the state corresponds to the
     initial state, the path cost and dept are set to 0, however if the parent (and action) was specified, it sets the
-    cost and depth to be parent's cost and depth both + 1"""
+    cost and depth to be parent's cost and depth both + 1. The heuristic value of the node is cached in heuristic once it
+    has been computed (see the heuristic function below)"""
+    __slots__ = ("state", "parent", "action", "path_cost", "depth", "heuristic")  # no __dict__ for each node
+
     def __init__(self, state, parent=None, action=None):
         self.state = state
         self.parent = parent
         self.action = action
         self.path_cost = 0
         self.depth = 0
+        self.heuristic = None
         if parent:
             self.depth = parent.depth + 1
             self.path_cost = parent.path_cost + 1
@@ -24,121 +29,641 @@ class Node:
         this path and at the end reverse the list to get the path form the initial node to the given node"""
         solution = list()
         node = self
-        solution.insert(0, node)
+        solution.append(node)
         while node.parent:
             node = node.parent
-            solution.insert(0, node)
+            solution.append(node)
+        solution.reverse()
         return solution
 
-def expand(parent, problem):
-    """the expand function takes as argument a node to expand and generate its successors by calling the successor
-    function from the corresponding problem class (where we formulate the problem). It also increments the number of
-    expanded nodes and prints it to the user so that the user can keep track of the number of expanded nodes. This
-    function returns a list of the successors of the given node"""
-    global closed_list
-    global number_expanded_nodes
-    closed_list.append(parent)
-    number_expanded_nodes += 1
-    print("Number of expanded nodes is:", number_expanded_nodes)
-    successors = problem.successor_function(parent)
-    return successors
-
-def make_queue(element):
-    """this function takes as input a node and create a list with the first element being the give node (used only to
-    with the initial node to create the frontier list)"""
-    frontier = list()
-    frontier.append(element)
-    return frontier
+class Frontier:
+    """the frontier keeps the nodes that are waiting to be expanded together with an index (a dictionary from the key
+    of a state to its node) of the states that are in it, so that checking if a state is already queued takes O(1).
+    The subclasses decide in which order the nodes are taken out"""
+    def __init__(self):
+        self.states = dict()
 
-def queuing_fct(frontier, generated_nodes, strategy, problem):
-    """the queuing function inserts nodes in the frontier in a way that is dependent on the search strategy used"""
-    global closed_list
-    global number_loops
-    for node1 in generated_nodes:
-        print("current generated node")
-        print(node1.state)
-        flag = 0
-        for node2 in closed_list:
-            """in this loop we are checking if the generated node is already in the closed list. If this is the case we
-            increment the number of loops by 1 and we report it to the user"""
-            """The loop checker detects cycles, we generally want to avoid cycles, it is therefore important to track them
-            since it is an important metric.
-            """
-
-            if node1.state == node2.state:
-                print("A loop has been detected")
-                number_loops += 1
-                print("Number of loops is: ", number_loops)
-                flag = 1
-        if flag == 0:
-            if strategy == 1:
-                """if the search strategy specified is BFS, newly generated nodes are inserted at the end of the list"""
-                "As specified in class, BFS and DFS differ only in the position where the node is appended"
-                frontier.append(node1)
-            elif strategy == 2:
-                """if the search strategy specified is BFS, newly generated nodes are inserted at the start of the list"""
-                frontier.insert(0, node1)
-            elif strategy == 3:
-                """if the search strategy is GBFS we just append newly generated node at the end and after in code we 
-                sort the nodes in the frontier in an increasing order based on the value returned by the heuristic 
-                function from the problem formulation"""
-                frontier.append(node1)
-                frontier.sort(key=problem.heuristic_value)
-                print("The heuristic value is: ")
-                print(problem.heuristic_value(node1))
-            elif strategy == 4:
-                """if the search strategy is A* we sort the the nodes in the frontier in an increasing order based on the
-                 value of the path cost + the heuristic value"""
-                if len(frontier) == 0:
-                    frontier.append(node1)
-                else:
-                    flag = 0
-                    for i in range(len(frontier)):
-                        if problem.heuristic_value(node1) + node1.path_cost <= problem.heuristic_value(frontier[i]) + frontier[i].path_cost:
-                            frontier.insert(i, node1)
-                            flag = 1
-                            break
-                    if flag == 0:
-                        frontier.append(node1)
-                print("The evaluation function value is: ")
-                print(problem.heuristic_value(node1) + node1.path_cost)
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, key):
+        return key in self.states
+
+    def push(self, node, key, value=None):
+        """inserts the node and returns True, or returns False if its state is already in the frontier"""
+        if key in self.states:
+            return False
+        self.states[key] = node
+        self.add(node, key, value)
+        return True
+
+    def pop(self):
+        node, key = self.remove()
+        del self.states[key]
+        return node
+
+
+class FifoFrontier(Frontier):
+    """frontier used by BFS, nodes are taken out in the order in which they were inserted"""
+    def __init__(self):
+        super().__init__()
+        self.queue = deque()
+
+    def add(self, node, key, value):
+        self.queue.append((node, key))
+
+    def remove(self):
+        return self.queue.popleft()
+
+
+class LifoFrontier(FifoFrontier):
+    """frontier used by DFS, the last inserted node is the first one to be taken out. A state that is reached again
+    while it is still in the frontier is moved to the top with its new node (the old entry is skipped when it comes
+    out), so DFS keeps going deeper from the node it generated last as it would without the frontier check"""
+    def push(self, node, key, value=None):
+        self.states[key] = node
+        self.queue.append((node, key))
+        return True
+
+    def remove(self):
+        while True:
+            node, key = self.queue.pop()
+            if self.states.get(key) is node:
+                return node, key
+
+
+class PriorityFrontier(Frontier):
+    """frontier used by GBFS and A*. It is a binary heap ordered by the value given when the node was pushed (the
+    heuristic value for GBFS and path cost + heuristic value for A*), so the value is computed only once per node. On
+    equal values the deeper node comes first and after that the node that was inserted first.
+    If a state that is already queued is reached with a lower path cost, the new node replaces the old one in the
+    index and the old heap entry is left in place and skipped when it comes out (lazy deletion)"""
+    def __init__(self):
+        super().__init__()
+        self.heap = list()
+        self.counter = 0
+
+    def push(self, node, key, value=None):
+        old = self.states.get(key)
+        if old is not None and old.path_cost <= node.path_cost:
+            return False
+        self.states[key] = node
+        self.add(node, key, value)
+        return True
+
+    def add(self, node, key, value):
+        self.counter += 1
+        heappush(self.heap, (value, -node.depth, self.counter, key, node))
+
+    def remove(self):
+        while True:
+            entry = heappop(self.heap)
+            if self.states.get(entry[3]) is entry[4]:
+                return entry[4], entry[3]
+
+STRATEGIES = range(1, 11)  # the numbers of the strategies of SearchEngine
+
+def make_queue(element, strategy, problem):
+    """this function takes as input a node and creates the frontier that corresponds to the search strategy with the
+    given node in it (used only with the initial node to create the frontier)"""
+    if strategy == 1:
+        frontier = FifoFrontier()
+    elif strategy == 2:
+        frontier = LifoFrontier()
+    elif strategy in (3, 4):
+        frontier = PriorityFrontier()
+    else:
+        raise ValueError("there is no frontier for the strategy %r" % (strategy,))
+    frontier.push(element, problem.state_key(element.state), evaluate(element, strategy, problem))
     return frontier
 
-def general_search(problem, strategy):
-    """this is our general search engine. It first create a node corresponding to the initail state and gives it as
-    argument to make_queue function"""
-    initial_node = Node(problem.initial_state)
-    frontier = make_queue(initial_node)
-    limit = 500
-    while len(frontier) > 0:
-        """we first pop the first node from the frontier"""
-        node1 = frontier.pop(0)
-        print("node to expand")
-        print(node1.state)
-        if problem.goal_test(node1.state):
-            """then we return the node if its state correspond to the goal state"""
-            print("Total number of loops is: ", number_loops)
-            print("Total number of nodes expanded is: ", number_expanded_nodes)
-            return node1
-        if number_expanded_nodes >= limit:
-            """"if it is not the goal state we check first if the search is taking a long time by checking the number of
-            expanded nodes and we give the user the choice to whether continue the search or stop it"""
-            val = int(input("It seems that the search is taking a lot of time. If you want to continue press 1 otherwise press 0: "))
-            if val == 0:
-                print("Total number of loops is: ", number_loops)
-                print("Total number of nodes expanded is: ", number_expanded_nodes)
+def heuristic(node, problem):
+    """returns the heuristic value of the node, it is computed only once and cached in the node. If the heuristic value
+    of the parent is known, the problem derives the value of the child from it (see Problem.child_heuristic_value),
+    which is cheaper than computing it from scratch. If problem.check_heuristic is set, the derived value is compared
+    with the value computed from scratch"""
+    if node.heuristic is None:
+        parent = node.parent
+        if parent is not None and parent.heuristic is not None:
+            node.heuristic = problem.child_heuristic_value(parent, node)
+            if problem.check_heuristic and node.heuristic != problem.heuristic_value(node):
+                raise AssertionError("the heuristic value derived from the parent is %s but it should be %s"
+                                     % (node.heuristic, problem.heuristic_value(node)))
+        else:
+            node.heuristic = problem.heuristic_value(node)
+    return node.heuristic
+
+def evaluate(node, strategy, problem):
+    """returns the value that orders the node in the frontier, GBFS uses the heuristic value and A* uses the path cost
+    + the heuristic value. BFS and DFS do not need any value"""
+    if strategy == 3:
+        return heuristic(node, problem)
+    if strategy == 4:
+        return heuristic(node, problem) + node.path_cost
+    return None
+
+def frontier_minimum(frontier):
+    """returns the smallest value in a PriorityFrontier, dropping the entries that were replaced (lazy deletion)"""
+    heap = frontier.heap
+    while frontier.states.get(heap[0][3]) is not heap[0][4]:
+        heappop(heap)
+    return heap[0][0]
+
+def join_paths(forward_node, backward_node, problem):
+    """the two nodes have the same state key, forward_node is the end of a path from the initial state and backward_node
+    is the end of a path from the goal. Each node of the backward path was generated by a predecessor function, so its
+    action leads from its state to the state of its parent. We walk up the backward path and append a node for each
+    state to the forward path, so the result is a normal goal node whose parents lead back to the initial state.
+    If the two states are only symmetric, the backward path is first mapped onto the orientation of the forward one"""
+    node = forward_node
+    mapping = problem.map_path_state(backward_node.state, forward_node.state)
+    while backward_node.parent:
+        state, action = backward_node.parent.state, backward_node.action
+        if mapping is not None:
+            state, action = mapping(state, action)
+        node = Node(state, node, action)
+        backward_node = backward_node.parent
+    return node
+
+def path_to_node(steps, problem):
+    """steps is a path as a list of (state, action) from the initial state to the goal, the action leading to the state
+    (None for the first one). Returns the goal node whose parents lead back to the initial state. The searches that
+    keep their states by key may have found a path that starts from a symmetric image of the initial state, the whole
+    path is then mapped onto the initial state (see Problem.map_path_state)"""
+    mapping = problem.map_path_state(steps[0][0], problem.initial_state)
+    if mapping is not None:
+        steps = [(problem.initial_state, None)] + [mapping(state, action) for state, action in steps[1:]]
+    node = Node(steps[0][0])
+    for state, action in steps[1:]:
+        node = Node(state, node, action)
+    return node
+
+def continue_search():
+    """asks the user whether a search that is taking a long time should go on"""
+    val = int(input("It seems that the search is taking a lot of time. If you want to continue press 1 otherwise press 0: "))
+    return val != 0
+
+
+class SearchResult:
+    """what a search returns: the goal node (None if no goal was found) and the statistics of the run.
+    status tells why the search ended: "solved", "no solution" (every state that could be reached was searched),
+    "unsolvable" (the problem showed that the goal cannot be reached before searching), "node limit", "time limit",
+    "memory limit" or "stopped" (the user chose to stop). pruned has the number of nodes pruned by each rule of
+    Problem.is_dead_end, peak_frontier is the largest number of nodes that were waiting to be expanded at the same time
+    and wall_time is in seconds. bound is only set by the anytime search: the cost of the solution is at most bound times
+    the optimal cost. When a budget stops the anytime search it returns its best solution so far in node, with the
+    status of the budget ("time limit", ...), so a solution is only "solved" when the search is over"""
+    def __init__(self, node, status, expanded, loops, pruned, peak_frontier, wall_time, bound=None):
+        self.node = node
+        self.status = status
+        self.expanded = expanded
+        self.loops = loops
+        self.pruned = pruned
+        self.peak_frontier = peak_frontier
+        self.wall_time = wall_time
+        self.bound = bound
+
+    def solution(self):
+        """returns the nodes from the initial state to the goal, or None if no goal was found"""
+        if self.node is None:
+            return None
+        return self.node.print_solution()
+
+
+class SearchEngine:
+    """this is our general search engine. An engine runs one search strategy on one problem and keeps everything the
+    search needs (closed list, counters, budgets) for itself, so several engines can run in the same process, one after
+    the other or at the same time in different threads, without seeing each other's states.
+    The strategies are numbered as in the menu of test.py: 1 BFS, 2 DFS, 3 GBFS, 4 A*, 5 iterative deepening DFS,
+    6 IDA*, 7 bidirectional BFS, 8 bidirectional A*, 9 the exact distance table of the 8-puzzle and 10 anytime weighted
+    A* (see anytime_search, weight and weight_step are its weights). Any other number raises a ValueError.
+    ordering and table_size are the options of 5 and 6 (see bounded_search): whether the children are visited in the
+    increasing order of their heuristic value (None is the default of the strategy: no for 5, yes for 6) and the
+    largest number of states of the transposition table (0 for no table).
+    The search stops when one of the budgets is used up: max_nodes expanded nodes, max_time seconds, or
+    max_stored_nodes nodes kept in memory at the same time (frontier and closed list, the stack and the transposition
+    table for 5 and 6), which is what the memory of a search is made of. A budget that is None is not checked.
+    If confirm is given, it is called every confirm_every expanded nodes and the search stops if it returns False (this
+    is how the menu asks the user whether to go on).
+    listeners is a list of objects that are told what the search does (see instrumentation.SearchListener), if verbose
+    is set the progress of the search is printed by an instrumentation.ConsoleListener. Without listeners the search
+    only pays for one test per event"""
+    def __init__(self, problem, strategy, max_nodes=None, max_time=None, max_stored_nodes=None, verbose=False,
+                 confirm=None, confirm_every=500, listeners=None, weight=3.0, weight_step=0.5, ordering=None,
+                 table_size=100000):
+        if strategy not in STRATEGIES:
+            raise ValueError("unknown strategy %r, the strategies are numbered from 1 to %d" % (strategy,
+                                                                                              max(STRATEGIES)))
+        self.problem = problem
+        self.strategy = strategy
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.max_stored_nodes = max_stored_nodes
+        self.verbose = verbose
+        self.confirm = confirm
+        self.confirm_every = confirm_every
+        self.listeners = list(listeners or ())
+        self.weight = weight
+        self.weight_step = weight_step
+        self.ordering = ordering
+        self.table_size = table_size
+
+    def run(self):
+        """runs the search and returns a SearchResult. Running the engine again starts a new search"""
+        self.closed_list = set()  # keys (see Problem.state_key) of the states that have been expanded
+        self.number_expanded_nodes = 0
+        self.number_loops = 0
+        self.pruned_nodes = dict()  # name of the rule of Problem.is_dead_end -> number of nodes it pruned
+        self.peak_frontier = 0
+        self.next_confirm = self.confirm_every
+        self.status = None
+        self.bound = None
+        self.listener = None
+        problem = self.problem
+        if self.listeners or self.verbose:
+            from instrumentation import ConsoleListener, combine_listeners  # only needed when the search is observed
+            self.listener = combine_listeners(self.listeners + ([ConsoleListener()] if self.verbose else []))
+            self.listener.on_start(self)  # a listener may put a wrapper around self.problem for this run
+        self.start = time.perf_counter()
+        try:
+            node = self.search()
+        finally:
+            self.problem = problem
+        if self.status is None:
+            self.status = "no solution" if node is None else "solved"
+        result = SearchResult(node, self.status, self.number_expanded_nodes, self.number_loops, self.pruned_nodes,
+                              self.peak_frontier, time.perf_counter() - self.start, self.bound)
+        if self.listener is not None:
+            self.listener.on_finish(result)
+        return result
+
+    def out_of_budget(self, stored):
+        """returns True if the search has to stop now, stored being the number of nodes it keeps in memory. The reason is
+        kept in self.status"""
+        if self.max_nodes is not None and self.number_expanded_nodes >= self.max_nodes:
+            self.status = "node limit"
+        elif self.max_time is not None and time.perf_counter() - self.start >= self.max_time:
+            self.status = "time limit"
+        elif self.max_stored_nodes is not None and stored >= self.max_stored_nodes:
+            self.status = "memory limit"
+        elif self.confirm is not None and self.number_expanded_nodes >= self.next_confirm:
+            if self.confirm():
+                self.next_confirm += self.confirm_every
+            else:
+                self.status = "stopped"
+        return self.status is not None
+
+    def new_frontier(self, frontier):
+        """called for each frontier the search creates, so a listener can observe its operations"""
+        if self.listener is not None:
+            self.listener.on_frontier(frontier)
+        return frontier
+
+    def expand(self, parent):
+        """the expand function takes as argument a node to expand and generate its successors by calling the successor
+        function from the corresponding problem class (where we formulate the problem). It also increments the number of
+        expanded nodes so that the user can keep track of it. This function returns a list of the successors of the
+        given node"""
+        self.closed_list.add(self.problem.state_key(parent.state))
+        self.number_expanded_nodes += 1
+        if self.listener is not None:
+            self.listener.on_expand(parent)
+        return self.problem.successor_function(parent)
+
+    def loop_detected(self, node):
+        """The loop checker detects cycles, we generally want to avoid cycles, it is therefore important to track them
+        since it is an important metric"""
+        self.number_loops += 1
+        if self.listener is not None:
+            self.listener.on_duplicate(node)
+
+    def dead_end(self, node):
+        """returns True if the problem knows that the goal cannot be reached from the state of the node (see
+        Problem.is_dead_end), the node is then dropped before it is queued and the rule that pruned it is counted"""
+        rule = self.problem.is_dead_end(node.state)
+        if rule is None:
+            return False
+        self.pruned_nodes[rule] = self.pruned_nodes.get(rule, 0) + 1
+        if self.listener is not None:
+            self.listener.on_prune(node, rule)
+        return True
+
+    def queuing_fct(self, frontier, generated_nodes):
+        """the queuing function inserts nodes in the frontier in a way that is dependent on the search strategy used"""
+        problem, strategy, listener = self.problem, self.strategy, self.listener
+        for node1 in generated_nodes:
+            if listener is not None:
+                listener.on_generate(node1)
+            key = problem.state_key(node1.state)
+            if key in self.closed_list:
+                """here we are checking if the generated node is already in the closed list. If this is the case we
+                increment the number of loops by 1 and we report it to the user"""
+                self.loop_detected(node1)
+                continue
+            if self.dead_end(node1):
+                continue
+            """As specified in class, BFS and DFS differ only in the position where the node is taken out, which is
+            handled by the frontier. A state that is already in the frontier is not queued again, except by GBFS and A*
+            when the new node reached it with a lower path cost"""
+            value = evaluate(node1, strategy, problem)
+            if frontier.push(node1, key, value) and listener is not None:
+                listener.on_enqueue(node1, value)
+        if len(frontier) > self.peak_frontier:
+            self.peak_frontier = len(frontier)
+        return frontier
+
+    def search(self):
+        """it first checks that the goal can be reached at all, then runs the strategy and returns the goal node or None.
+        For BFS, DFS, GBFS and A* it creates a node corresponding to the initail state and gives it as argument to
+        make_queue function"""
+        problem, strategy = self.problem, self.strategy
+        if not problem.is_solvable() or self.dead_end(Node(problem.initial_state)):
+            self.status = "unsolvable"
+            return None
+        if strategy == 5:
+            return self.iterative_search(lambda node: node.path_cost,
+                                         False if self.ordering is None else self.ordering, self.table_size)
+        if strategy == 6:
+            return self.iterative_search(lambda node: node.path_cost + heuristic(node, problem),
+                                         True if self.ordering is None else self.ordering, self.table_size)
+        if strategy == 7:
+            return self.bidirectional_search(1)
+        if strategy == 8:
+            return self.bidirectional_search(4)
+        if strategy == 9:
+            from distance_table import table_search  # imported here since distance_table itself imports this module
+            return table_search(problem)
+        if strategy == 10:
+            return self.anytime_search()
+        initial_node = Node(problem.initial_state)
+        frontier = self.new_frontier(make_queue(initial_node, strategy, problem))
+        while len(frontier) > 0:
+            """we first take out the next node from the frontier"""
+            node1 = frontier.pop()
+            if problem.goal_test(node1.state):
+                """then we return the node if its state correspond to the goal state"""
+                return node1
+            """if it is not the goal state we check first if the search has used up one of its budgets, which includes
+            asking the user whether to continue if the engine was given a confirm function"""
+            if self.out_of_budget(len(frontier) + len(self.closed_list)):
                 return None
+            """the queuing function takes as parameters frontier and the successors generated by the expand function.
+            NOTE: the queuing function is only invoked if there are still nodes in the frontier to expand and the search
+            still has budget left"""
+            frontier = self.queuing_fct(frontier, self.expand(node1))
+        return None
+
+        "Important note, we decided to omit displaying the frontier, since it could contain thousands of nodes in some cases"
+
+        " It will therefore clutter the console, that's why we didn't include it in the output"
+
+    def iterative_search(self, evaluation, ordering, table_size=100000):
+        """iterative deepening DFS (evaluation is the path cost) and IDA* (evaluation is the path cost + the heuristic
+        value, and the children are visited in the increasing order of their heuristic value): a depth-first search that
+        does not go into nodes whose evaluation is greater than a bound (see bounded_search), repeated with a bound that
+        starts at the value of the initial node and grows to the smallest value that was cut off in the previous
+        iteration, until a goal is found or nothing was cut off (no solution). Only the current path is kept in memory"""
+        initial_node = Node(self.problem.initial_state)
+        bound = evaluation(initial_node)
+        goal = None
+        while bound is not None:
+            if self.listener is not None:
+                self.listener.on_bound(bound)
+            goal, bound = self.bounded_search(initial_node, bound, evaluation, ordering, table_size)
+            if goal is not None or bound is False:
+                break
+        return goal
+
+    def bounded_search(self, initial_node, bound, evaluation, ordering, table_size):
+        """depth-first search that does not go into nodes whose evaluation is greater than the bound. It returns the goal
+        node (or None) and the smallest evaluation that went over the bound (None if no node did, False if the search
+        ran out of budget).
+        The stack only holds the nodes of the current path with the children that are still left to visit, and a state
+        that is already on the current path is a loop and is skipped, so the memory grows with the depth of the search.
+        The transposition table remembers the lowest path cost with which a state was reached during this iteration (for
+        at most table_size states) so that a state reached again with a path cost that is not lower is not searched
+        twice. If ordering is set the children are visited in the increasing order of their heuristic value"""
+        problem, listener = self.problem, self.listener
+        if problem.goal_test(initial_node.state):
+            return initial_node, None
+        next_bound = None
+        table = dict()
+        key = problem.state_key(initial_node.state)
+        on_path = {key}
+        stack = [(initial_node, key, iter(self.bounded_expand(initial_node, ordering)))]
+        while stack:
+            node, key, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_path.discard(key)
+                continue
+            if listener is not None:
+                listener.on_generate(child)
+            child_key = problem.state_key(child.state)
+            if child_key in on_path:
+                self.loop_detected(child)
+                continue
+            if self.dead_end(child):
+                continue
+            value = evaluation(child)
+            if value > bound:
+                if next_bound is None or value < next_bound:
+                    next_bound = value
+                continue
+            seen = table.get(child_key)
+            if seen is not None and seen <= child.path_cost:
+                continue
+            if seen is not None or len(table) < table_size:
+                table[child_key] = child.path_cost
+            if problem.goal_test(child.state):
+                return child, next_bound
+            if self.out_of_budget(len(stack) + len(table)):
+                return None, False
+            if listener is not None:
+                listener.on_enqueue(child, value)
+            stack.append((child, child_key, iter(self.bounded_expand(child, ordering))))
+            on_path.add(child_key)
+            if len(stack) > self.peak_frontier:
+                self.peak_frontier = len(stack)
+        return None, next_bound
+
+    def bounded_expand(self, parent, ordering):
+        """expands a node for bounded_search, it is the same as expand but the node is not added to the closed list"""
+        self.number_expanded_nodes += 1
+        if self.listener is not None:
+            self.listener.on_expand(parent)
+        successors = self.problem.successor_function(parent)
+        if ordering:
+            successors.sort(key=lambda node: heuristic(node, self.problem))
+        return successors
+
+    def bidirectional_search(self, strategy):
+        """searches forward from the initial state and backward from the goal state (using problem.predecessor_function)
+        at the same time until the two searches meet. With strategy 1 both sides are breadth-first and the side with the
+        smallest frontier expands a whole layer at a time. With strategy 4 both sides are A*: the forward side uses
+        heuristic_value and the backward side uses backward_heuristic_value (front-to-end). The search stops when no
+        path through the remaining frontiers can be cheaper than the best meeting found so far. The two halves of the
+        solution are joined into one chain of nodes from the initial state to the goal (see join_paths)"""
+        problem, listener = self.problem, self.listener
+        forward_root = Node(problem.initial_state)
+        backward_root = Node(problem.goal)
+        """each side has a frontier and a closed dictionary (key of a state -> its node), a node of one side whose state
+        is in the frontier or the closed dictionary of the other side is a meeting point"""
+        sides = list()
+        for root, successors, evaluation in (
+                (forward_root, problem.successor_function, lambda node: node.path_cost + heuristic(node, problem)),
+                (backward_root, problem.predecessor_function, lambda node: node.path_cost + node.heuristic)):
+            if strategy == 1:
+                frontier = self.new_frontier(FifoFrontier())
+                evaluation = None
             else:
-                limit = limit + 500
-        """the queuing function takes as parameters frontier, the successors generated by the expand function, the search
-        strategy specified by the user, and the problem formulation.NOTE: the queuing function is only invoked if there
-        are still nodes in the frontier to expand or if the user is still willing to continue the search"""
-        frontier = queuing_fct(frontier, expand(node1, problem), strategy, problem)
-    print("Total number of loops is: ", number_loops)
-    print("Total number of nodes expanded is: ", number_expanded_nodes)
-    return None
+                frontier = self.new_frontier(PriorityFrontier())
+                root.heuristic = problem.heuristic_value(root) if root is forward_root \
+                    else problem.backward_heuristic_value(root)
+            frontier.push(root, problem.state_key(root.state), evaluation and evaluation(root))
+            sides.append((frontier, dict(), successors, evaluation))
+        best = None  # (forward node, backward node) of the cheapest meeting found so far
+        best_cost = None
+        if problem.state_key(forward_root.state) == problem.state_key(backward_root.state):
+            best, best_cost = (forward_root, backward_root), 0
+        stopped = False
+        while not stopped and (best is None or strategy == 4):
+            if len(sides[0][0]) == 0 or len(sides[1][0]) == 0:
+                break
+            if strategy == 4 and best is not None:
+                if max(frontier_minimum(sides[0][0]), frontier_minimum(sides[1][0])) >= best_cost:
+                    break
+            side = 0 if len(sides[0][0]) <= len(sides[1][0]) else 1
+            frontier, closed, successors, evaluation = sides[side]
+            other_frontier, other_closed = sides[1 - side][0], sides[1 - side][1]
+            """BFS expands all the nodes of the current layer, A* only the best node"""
+            for _ in range(len(frontier) if strategy == 1 else 1):
+                stored = len(sides[0][0]) + len(sides[0][1]) + len(sides[1][0]) + len(sides[1][1])
+                if self.out_of_budget(stored):
+                    stopped = True
+                    break
+                node1 = frontier.pop()
+                closed[problem.state_key(node1.state)] = node1
+                self.number_expanded_nodes += 1
+                if listener is not None:
+                    listener.on_expand(node1)
+                for child in successors(node1):
+                    if listener is not None:
+                        listener.on_generate(child)
+                    child_key = problem.state_key(child.state)
+                    if child_key in closed:
+                        self.loop_detected(child)
+                        continue
+                    if side == 0 and self.dead_end(child):
+                        continue
+                    if evaluation is None:
+                        value = None
+                    else:
+                        if side == 1:
+                            child.heuristic = problem.backward_heuristic_value(child)
+                        value = evaluation(child)
+                    if frontier.push(child, child_key, value) and listener is not None:
+                        listener.on_enqueue(child, value)
+                    other = other_closed.get(child_key) or other_frontier.states.get(child_key)
+                    if other is not None and (best is None or child.path_cost + other.path_cost < best_cost):
+                        best_cost = child.path_cost + other.path_cost
+                        best = (child, other) if side == 0 else (other, child)
+            if len(sides[0][0]) + len(sides[1][0]) > self.peak_frontier:
+                self.peak_frontier = len(sides[0][0]) + len(sides[1][0])
+        if stopped or best is None:
+            return None
+        return join_paths(best[0], best[1], problem)
+
+    def anytime_search(self):
+        """anytime weighted A* in the way of ARA*: a first solution is found quickly with A* where the heuristic value
+        counts self.weight times, then the search goes on with a smaller weight (self.weight_step less each time) until
+        the weight is 1 or a budget is used up, and the best solution found so far is returned. With a weight w the
+        solution costs at most w times the optimal cost if the heuristic never overestimates and never drops by more
+        than the cost of a move, which is what self.bound reports.
+        The search is not started again for each weight: the nodes that were waiting in the frontier are kept (with
+        their values for the new weight) and so is the best path cost found for each state. A state that is reached
+        with a lower path cost after it was expanded with the current weight is not expanded again with it, it is kept
+        aside (inconsistent) and put back in the frontier for the next weight. The bound is also improved with the
+        smallest path cost + heuristic value of these nodes, which is a lower bound of the optimal cost"""
+        problem, listener = self.problem, self.listener
+        initial_node = Node(problem.initial_state)
+        if problem.goal_test(initial_node.state):
+            self.bound = 1.0
+            return initial_node
+        weight, done_weight = self.weight, None
+        best = {problem.state_key(initial_node.state): initial_node}  # key -> node with the lowest path cost so far
+        waiting = [initial_node]  # the nodes to put in the frontier for the next weight
+        incumbent = None
+        while True:
+            self.closed_list = set()
+            frontier = self.new_frontier(PriorityFrontier())
+            for node in waiting:
+                frontier.push(node, problem.state_key(node.state), node.path_cost + weight * heuristic(node, problem))
+            inconsistent = dict()
+            while len(frontier) and (incumbent is None or frontier_minimum(frontier) < incumbent.path_cost):
+                if self.out_of_budget(len(frontier) + len(best)):
+                    self.bound = self.anytime_bound(incumbent, frontier, inconsistent, done_weight)
+                    return incumbent
+                node = frontier.pop()
+                for child in self.expand(node):
+                    if listener is not None:
+                        listener.on_generate(child)
+                    key = problem.state_key(child.state)
+                    old = best.get(key)
+                    if old is not None and old.path_cost <= child.path_cost:
+                        self.loop_detected(child)
+                        continue
+                    if self.dead_end(child):
+                        continue
+                    best[key] = child
+                    if problem.goal_test(child.state):
+                        if incumbent is None or child.path_cost < incumbent.path_cost:
+                            incumbent = child
+                    elif key in self.closed_list:
+                        inconsistent[key] = child
+                    else:
+                        value = child.path_cost + weight * heuristic(child, problem)
+                        if frontier.push(child, key, value) and listener is not None:
+                            listener.on_enqueue(child, value)
+                if len(frontier) > self.peak_frontier:
+                    self.peak_frontier = len(frontier)
+            if incumbent is None:
+                return None
+            done_weight = weight
+            self.bound = self.anytime_bound(incumbent, frontier, inconsistent, done_weight)
+            if listener is not None:
+                listener.on_solution(incumbent, self.bound)
+            if self.bound <= 1.0:
+                return incumbent
+            weight = max(1.0, min(weight - self.weight_step, self.bound))
+            waiting = list(frontier.states.values()) + list(inconsistent.values())
 
-    "Important note, we decided to omit displaying the frontier, since it could contain thousands of nodes in some cases"
-    
-    " It will therefore clutter the console, that's why we didn't include it in the output"
+    def anytime_bound(self, incumbent, frontier, inconsistent, done_weight):
+        """returns the factor by which the cost of the incumbent may exceed the optimal cost: the weight of the last
+        search that was finished, or the cost divided by the smallest path cost + heuristic value of the nodes that
+        could still lead to a cheaper solution if that is smaller (1.0 when there are none left)"""
+        if incumbent is None:
+            return None
+        values = [node.path_cost + heuristic(node, self.problem)
+                  for node in list(frontier.states.values()) + list(inconsistent.values())]
+        if not values:
+            return 1.0
+        bound = incumbent.path_cost / min(values) if min(values) > 0 else float("inf")
+        if done_weight is not None:
+            bound = min(bound, done_weight)
+        return max(1.0, bound)
 
+
+def solve(problem, strategy, max_nodes=None, max_time=None, max_stored_nodes=None, verbose=False, confirm=None,
+          listeners=None, weight=3.0, weight_step=0.5, ordering=None, table_size=100000):
+    """runs one search and returns its SearchResult, see SearchEngine for the arguments. Nothing is shared between two
+    calls, so it can be called again, or from several threads at the same time"""
+    return SearchEngine(problem, strategy, max_nodes, max_time, max_stored_nodes, verbose, confirm,
+                        listeners=listeners, weight=weight, weight_step=weight_step, ordering=ordering,
+                        table_size=table_size).run()
+
+def general_search(problem, strategy):
+    """the interactive search of our first version: it prints its progress, asks the user every 500 expanded nodes
+    whether it should go on and returns the goal node or None"""
+    return solve(problem, strategy, verbose=True, confirm=continue_search).node
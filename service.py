@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import sys
+import time
+from collections import OrderedDict, deque
+from http import HTTPStatus
+
+from batch import init_worker, solve_instance
+
+"""a solve service: an asyncio HTTP server that solves the instances it receives with a pool of worker processes, so
+that the solver can be called by other programs instead of through the menu of test.py. An instance is the JSON object
+of batch.py (problem, initial, goal, strategy, optional budgets and parameters of the problem) and the answer is the
+record that batch.py writes for it. The server has three routes:
+    POST /solve          solves the instance in the body, it can also have an id (to cancel it) and a timeout
+    DELETE /solve/<id>   cancels the instance with this id that is waiting or being solved
+    GET /metrics         the number of requests of each status, the cache hits and misses and the latencies
+Each worker process solves one instance at a time. A search cannot be interrupted from the outside in the middle of an
+expansion, so a request that is cancelled (DELETE, or its client closed the connection) or that runs out of time
+terminates the process that solves it and a new worker is started in its place (in the background, the answer does not
+wait for it). The timeout of a request is also given to the search as its max_time, so most searches stop by themselves
+a little before (with the best solution found so far for the anytime search) and the worker is only terminated if it
+does not answer in time.
+When all the workers are busy the requests wait for one, up to queue_size of them; after that the server answers 503
+at once instead of letting the wait grow, and the client should try again later.
+The results are kept in a LRU cache keyed by the problem (with its parameters), the initial state, the goal and the
+strategy, so asking the same question again is answered without searching. Only final answers are cached: a solution
+found within a budget, or the proof that there is none, not a search that ran out of budget and not the solution of
+the anytime search before it is proven optimal.
+Usage: python service.py [--port 8080] [--workers 4] [--timeout 30] (see --help), then for example
+    curl -d '{"problem": "sliding", "initial": [1,2,3,4,5,6,0,7,8], "goal": [1,2,3,4,5,6,7,8,0], "strategy": 4}' \\
+        localhost:8080/solve"""
+
+GRACE = 1.0  # seconds a worker has after the timeout of its request to answer before it is terminated
+READ_TIMEOUT = 10.0  # seconds a client has to send its request
+MAX_BODY = 2 ** 20
+FINAL = ("solved", "no solution", "unsolvable")  # the statuses that do not depend on the budgets
+LATENCIES = 1000  # the latencies of the last requests that the percentiles are computed on
+
+
+def worker_main(connection, databases):
+    """the loop of a worker process: receives an instance on its pipe, sends back its record"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C stops the server, which stops its workers
+    init_worker(databases)
+    while True:
+        try:
+            instance = connection.recv()
+        except EOFError:
+            break
+        connection.send(solve_instance(instance))
+
+
+class Worker:
+    """a worker process and the pipe to it"""
+    def __init__(self, context, databases):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child, list(databases)), daemon=True)
+        self.process.start()
+        child.close()
+
+    async def solve(self, instance):
+        """sends the instance to the process and waits for its record without blocking the event loop. Raises
+        RuntimeError if the process stopped"""
+        loop = asyncio.get_running_loop()
+        answer = loop.create_future()
+        descriptor = self.connection.fileno()
+
+        def ready():
+            loop.remove_reader(descriptor)
+            if answer.done():
+                return
+            try:
+                answer.set_result(self.connection.recv())
+            except (EOFError, OSError):
+                answer.set_exception(RuntimeError("the worker process stopped"))
+
+        try:
+            self.connection.send(instance)
+        except OSError:
+            raise RuntimeError("the worker process stopped")
+        loop.add_reader(descriptor, ready)
+        try:
+            return await answer
+        finally:
+            loop.remove_reader(descriptor)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(1)
+        self.connection.close()
+
+
+def cache_key(instance):
+    """the key of the results of an instance in the cache, raises ValueError if the instance is missing a field"""
+    try:
+        return (str(instance["problem"]), tuple(int(cell) for cell in instance["initial"]),
+                tuple(int(cell) for cell in instance["goal"]), int(instance["strategy"]), instance.get("people"),
+                instance.get("capacity"), instance.get("width"))
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError("the instance needs a problem, an initial state, a goal and a strategy (%s)" % error)
+
+
+def check_times(instance):
+    """raises ValueError if the timeout or the max_time of the instance is given but is not a positive number"""
+    for field in ("timeout", "max_time"):
+        value = instance.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0):
+            raise ValueError("%s must be a positive number of seconds, not %r" % (field, value))
+
+
+def percentile(values, fraction):
+    """the value below which fraction of the sorted values are"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class SolveService:
+    """the state of the service: the workers, the requests being solved, the cache and the metrics. workers is the
+    number of worker processes (the number of cores by default), queue_size the number of requests that can wait for a
+    worker, cache_size the number of results kept, timeout the longest time in seconds a request can take (a request
+    can ask for less) and databases the pattern database files the workers use for the sliding puzzles"""
+    def __init__(self, workers=None, queue_size=64, cache_size=1024, timeout=30.0, databases=()):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.queue_size = queue_size
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.databases = list(databases)
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context("forkserver")  # forking the server itself would copy its loop
+        else:
+            self.context = multiprocessing.get_context("spawn")
+        self.idle = None
+        self.closed = False
+        self.cache = OrderedDict()
+        self.running = dict()  # id -> task of the request
+        self.restarting = set()  # the tasks that replace the workers of cancelled requests, see restart
+        self.pending = 0  # requests waiting for a worker or being solved
+        self.next_id = 0
+        self.counts = dict()  # status -> number of requests
+        self.hits = 0
+        self.misses = 0
+        self.latencies = deque(maxlen=LATENCIES)
+
+    def start(self):
+        self.idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self.idle.put_nowait(Worker(self.context, self.databases))
+
+    def close(self):
+        self.closed = True  # the workers that are busy are stopped when their requests are cancelled
+        while self.idle is not None and not self.idle.empty():
+            self.idle.get_nowait().stop()
+
+    def count(self, status):
+        self.counts[status] = self.counts.get(status, 0) + 1
+
+    async def solve(self, instance):
+        """answers a solve request, returns the HTTP status and the record of the instance"""
+        started = time.perf_counter()
+        key = cache_key(instance)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            record = dict(self.cache[key], id=instance.get("id"), cached=True)
+            self.count(record["status"])
+            self.latencies.append(time.perf_counter() - started)
+            return HTTPStatus.OK, record
+        self.misses += 1
+        if self.pending >= self.workers + self.queue_size:
+            self.count("rejected")
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"id": instance.get("id"), "status": "rejected",
+                                                    "error": "the queue is full, try again later"}
+        timeout = min(float(instance.get("timeout", self.timeout)), self.timeout)
+        self.pending += 1
+        try:
+            record = await asyncio.wait_for(self.run(instance, time.perf_counter() + timeout), timeout + GRACE)
+        except asyncio.TimeoutError:
+            record = {"id": instance.get("id"), "status": "timeout"}
+        except RuntimeError as error:
+            self.count("error")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"id": instance.get("id"), "status": "error", "error": str(error)}
+        except asyncio.CancelledError:
+            self.count("cancelled")
+            raise
+        finally:
+            self.pending -= 1
+        self.count(record["status"])
+        self.latencies.append(time.perf_counter() - started)
+        if record["status"] in FINAL and record.get("bound", 1.0) <= 1.0:
+            self.cache[key] = record
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        record = dict(record, cached=False)
+        if record["status"] == "timeout":
+            return HTTPStatus.GATEWAY_TIMEOUT, record
+        if record["status"] == "error":
+            return HTTPStatus.BAD_REQUEST, record
+        return HTTPStatus.OK, record
+
+    async def run(self, instance, deadline):
+        """solves the instance on the next idle worker. If the request is cancelled or times out while the worker is
+        solving it, the worker is terminated and replaced"""
+        worker = await self.idle.get()
+        try:
+            remaining = max(0.01, deadline - time.perf_counter())
+            return await worker.solve(dict(instance, max_time=min(instance.get("max_time", remaining), remaining)))
+        except BaseException:
+            restart = asyncio.ensure_future(self.restart(worker))
+            self.restarting.add(restart)
+            restart.add_done_callback(self.restarting.discard)
+            worker = None
+            raise
+        finally:
+            if worker is not None:
+                self.idle.put_nowait(worker)
+
+    async def restart(self, worker):
+        """terminates a worker and puts a new one in its place. Waiting for the process to end and starting the new one
+        block, so they run in threads of the loop's executor and the other requests are answered in the meantime"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, worker.stop)
+        if self.closed:
+            return
+        worker = await loop.run_in_executor(None, Worker, self.context, self.databases)
+        if self.closed:
+            await loop.run_in_executor(None, worker.stop)
+        else:
+            self.idle.put_nowait(worker)
+
+    def cancel(self, request_id):
+        """cancels the request with this id, returns False if there is none"""
+        task = self.running.get(request_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        lookups = self.hits + self.misses
+        report = {"requests": sum(self.counts.values()), "statuses": dict(self.counts), "in_flight": self.pending,
+                  "workers": self.workers, "queue_size": self.queue_size,
+                  "cache": {"hits": self.hits, "misses": self.misses, "size": len(self.cache),
+                            "hit_rate": round(self.hits / lookups, 4) if lookups else None},
+                  "latency_ms": None}
+        if latencies:
+            report["latency_ms"] = {"count": len(latencies),
+                                    "mean": round(1000 * sum(latencies) / len(latencies), 3),
+                                    "p50": round(1000 * percentile(latencies, 0.5), 3),
+                                    "p95": round(1000 * percentile(latencies, 0.95), 3),
+                                    "p99": round(1000 * percentile(latencies, 0.99), 3),
+                                    "max": round(1000 * latencies[-1], 3)}
+        return report
+
+    async def handle(self, reader, writer):
+        """answers one HTTP request on a connection (the connection is closed after the answer)"""
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(read_request(reader), READ_TIMEOUT)
+            except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"})
+                return
+            if method == "GET" and path == "/metrics":
+                write_response(writer, HTTPStatus.OK, self.metrics())
+            elif method == "POST" and path == "/solve":
+                await self.handle_solve(reader, writer, body)
+            elif method == "DELETE" and path.startswith("/solve/"):
+                request_id = path[len("/solve/"):]
+                if self.cancel(request_id):
+                    write_response(writer, HTTPStatus.OK, {"id": request_id, "status": "cancelled"})
+                else:
+                    write_response(writer, HTTPStatus.NOT_FOUND, {"error": "no request %s is running" % request_id})
+            else:
+                write_response(writer, HTTPStatus.NOT_FOUND, {"error": "unknown route %s %s" % (method, path)})
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_solve(self, reader, writer, body):
+        try:
+            instance = json.loads(body)
+            if not isinstance(instance, dict):
+                raise ValueError("the instance must be a JSON object")
+            cache_key(instance)
+            check_times(instance)
+        except ValueError as error:
+            write_response(writer, HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+        if "id" not in instance:
+            self.next_id += 1
+            instance["id"] = self.next_id
+        request_id = str(instance["id"])
+        if request_id in self.running:
+            write_response(writer, HTTPStatus.CONFLICT, {"error": "a request %s is already running" % request_id})
+            return
+        solving = asyncio.ensure_future(self.solve(instance))
+        closed = asyncio.ensure_future(wait_closed(reader))
+        self.running[request_id] = solving
+        try:
+            await asyncio.wait((solving, closed), return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:  # the server is stopping
+            solving.cancel()
+            await asyncio.gather(solving, return_exceptions=True)
+            raise
+        finally:
+            del self.running[request_id]
+            closed.cancel()
+        if not solving.done():  # the client left, nobody will read the answer
+            solving.cancel()
+            await asyncio.gather(solving, return_exceptions=True)
+            return
+        if solving.cancelled():
+            write_response(writer, HTTPStatus.OK, {"id": instance["id"], "status": "cancelled"})
+            return
+        status, record = solving.result()
+        write_response(writer, status, record)
+
+
+async def read_request(reader):
+    """reads an HTTP request, returns its method, path and body"""
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    method, path, version = head[0].split(" ")
+    headers = dict()
+    for line in head[1:]:
+        if line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if not 0 <= length <= MAX_BODY:
+        raise ValueError("the body is too large")
+    return method, path, await reader.readexactly(length)
+
+
+async def wait_closed(reader):
+    """returns when the client closes the connection, what it sends after its request is ignored"""
+    try:
+        while await reader.read(1024):
+            pass
+    except ConnectionError:
+        pass
+
+
+def write_response(writer, status, data):
+    body = json.dumps(data).encode()
+    head = "HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n" % (
+        status, status.phrase, len(body))
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        head += "Retry-After: 1\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+async def serve(service, host="127.0.0.1", port=8080):
+    """starts the workers of the service and answers requests on host:port until the task is cancelled"""
+    service.start()
+    try:
+        server = await asyncio.start_server(service.handle, host, port)
+        print("Solving on http://%s:%d with %d workers" % (host, port, service.workers))
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="HTTP service that solves instances with a pool of workers")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of cores)")
+    parser.add_argument("--queue-size", type=int, default=64, help="requests that can wait for a worker")
+    parser.add_argument("--cache-size", type=int, default=1024, help="number of results kept in the cache")
+    parser.add_argument("--timeout", type=float, default=30.0, help="longest time in seconds of a request")
+    parser.add_argument("--pattern-databases", nargs="*", default=[], help="pattern database files for the puzzles")
+    options = parser.parse_args(arguments)
+    service = SolveService(options.workers, options.queue_size, options.cache_size, options.timeout,
+                           options.pattern_databases)
+    try:
+        asyncio.run(serve(service, options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
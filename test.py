@@ -1,8 +1,9 @@
-from search import Node
-from search import general_search
+from search import solve, continue_search
+from parallel_search import hda_star, ParallelSearchResult
 from problem import *
 
-val = int(input("Choose on of the following games:\n1- Missionaries and Cannibals\n2. Peg solitaire\n3. 8-puzzle\nEnter your choice: "))
+val = int(input("Choose on of the following games:\n1- Missionaries and Cannibals\n2. Peg solitaire\n3. 8-puzzle (or any "
+                "other sliding puzzle)\nEnter your choice: "))
 flag = 0
 while flag == 0:
     if 1 <= val <= 3:
@@ -17,50 +18,79 @@ while flag == 0:
             print("Please input the number of missionaries and the number of cannibals on the right side and a value to"
                   "represent where the boat is on the goal state:")
             goal_state = [int(item) for item in input("Enter the numbers seperated by space: ").split()]
-            problem = ProblemMissionaries(initial_state, goal_state)
+            print("Please input the number of missionaries (which is also the number of cannibals) and the number of seats"
+                  " of the boat, or press enter for the usual puzzle (3 and 2):")
+            sizes = [int(item) for item in input("Enter the numbers seperated by space: ").split()] or [3, 2]
+            problem = ProblemMissionaries(initial_state, goal_state, sizes[0], sizes[1])
         elif val == 2:
             print("The state of Peg Solitaire is represented using a list that has 49 cells. Each cell can be one of the"
                   "following 3 values: 0 1 and 2. 0 means that there is no peg and the corresponding location "
                   "corresponds to a location on the board. 1 means that there is a peg on that location. 2 means that "
                   "the corresponding location is not the part of board")
-            print("Please input the values of the initial state. Make sure to enter 49 values!")
+            print("Please input the width of the board, or press enter for the usual 7x7 board:")
+            width = int(input("Enter the width: ") or 7)
+            print("Please input the values of the initial state. Make sure to enter the values of all the rows!")
             initial_state = [int(item) for item in input("Enter the numbers seperated by space: ").split()]
-            print("Please input the values of the goal state. Make sure to enter 49 values!")
+            print("Please input the values of the goal state. Make sure to enter the values of all the rows!")
             goal_state = [int(item) for item in input("Enter the numbers seperated by space: ").split()]
-            problem = PegProblem(initial_state, goal_state)
+            problem = PegProblem(initial_state, goal_state, width=width)
         elif val == 3:
             print("The state of 8-Puzzle is represented using a list that has 9 cells. Each cell contains the number of"
                   "the tile. To refer to the blank tile we use the number 0.")
-            print("Please input the values of the initial state. Make sure to enter 9 values!")
+            print("Please input the values of the initial state. Make sure to enter 9 values (16 for the 15-puzzle, 25 for"
+                  " the 24-puzzle)!")
             initial_state = [int(item) for item in input("Enter the numbers seperated by space: ").split()]
-            print("Please input the values of the goal state. Make sure to enter 9 values!")
+            print("Please input the values of the goal state. Make sure to enter as many values!")
             goal_state = [int(item) for item in input("Enter the numbers seperated by space: ").split()]
-            problem = Eight_PuzzleProblem(initial_state, goal_state)
+            if len(initial_state) == 9:
+                problem = Eight_PuzzleProblem(initial_state, goal_state)
+            else:
+                problem = SlidingPuzzleProblem(initial_state, goal_state)
     else:
             print("Please make sure you provide a valid choice for your game")
             val = int(input("Try again choosing a game: "))
 
 print("Please choose one of the following strategies (your choice must be the corresponding number in the menu below: ")
-val = int(input("1. Breadth-First search\n2. Depth-First search\n3. Greedy Best-First search\n4. A* search\nEnter your choice: "))
+val = int(input("1. Breadth-First search\n2. Depth-First search\n3. Greedy Best-First search\n4. A* search\n"
+                "5. Iterative deepening DFS\n6. IDA* search\n7. Bidirectional Breadth-First search\n"
+                "8. Bidirectional A* search\n9. Exact distance table (8-puzzle only)\n"
+                "10. Anytime weighted A* search (ARA*) with a time limit\nEnter your choice: "))
 flag = 0
 while flag == 0:
-    if 1 <= val <= 4:
+    if 1 <= val <= 10 and (val != 9 or isinstance(problem, Eight_PuzzleProblem)):
         flag = 1
-        node1 = general_search(problem, val)
+        if val == 10:
+            max_time = float(input("Enter the number of seconds the search can take: "))
+            result = solve(problem, val, max_time=max_time)  # printing every node would use up the time
+        elif val == 4 and input("Search on all the cores with the parallel A* (HDA*)? (y/n): ").strip() == "y":
+            result = hda_star(problem)
+        else:
+            result = solve(problem, val, verbose=True, confirm=continue_search)
+        node1 = result.node
         if node1:
             print("Goal has been achieved")
-            print(node1.state)
+            print(problem.decode_state(node1.state))
             print("The path cost is:")
             print(node1.path_cost)
-            solution = Node.print_solution(node1)
+            solution = result.solution()
             print("The solution path is:")
             for node in solution:
-                if node.action:
-                    print(node.state, "which was generated by this action:", node.action)
+                if node.parent:
+                    print(problem.decode_state(node.state), "which was generated by this action:",
+                          problem.decode_action(node.action))
                 else:
-                    print(node.state)
+                    print(problem.decode_state(node.state))
+            if result.status != "solved":
+                print("This is the best solution found before the search stopped (%s)" % result.status)
         else:
-            print("Search has failed")
+            print("Search has failed (%s)" % result.status)
+        print("The largest frontier had %d nodes and the search took %.3f seconds" % (result.peak_frontier,
+                                                                                   result.wall_time))
+        if val == 10 and result.bound is not None:
+            print("The solution costs at most %.2f times the optimal cost" % result.bound)
+        if isinstance(result, ParallelSearchResult):
+            for line in result.report():
+                print(line)
     else:
         print("Please make sure you provide a valid choice for your search strategy")
         val = int(input("Try again choosing a strategy: "))
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pattern_database import build_pattern_database
+
+GOAL = [1, 2, 3, 4, 5, 6, 7, 8, 0]
+
+
+@pytest.fixture(scope="session")
+def databases(tmp_path_factory):
+    """the additive pattern databases of the tiles 1-4 and 5-8 for GOAL, built once for all the tests"""
+    directory = tmp_path_factory.mktemp("databases")
+    paths = list()
+    for tiles in ((1, 2, 3, 4), (5, 6, 7, 8)):
+        path = str(directory / ("pdb_3_%s.bin" % "-".join(str(tile) for tile in tiles)))
+        build_pattern_database(GOAL, 3, tiles, path)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope="session")
+def table_directory(tmp_path_factory):
+    """the distance tables are written to the working directory, so the tests that use strategy 9 run in a temporary
+    one"""
+    directory = tmp_path_factory.mktemp("tables")
+    previous = os.getcwd()
+    os.chdir(directory)
+    yield directory
+    os.chdir(previous)
@@ -0,0 +1,37 @@
+from search import solve
+from problem import Eight_PuzzleProblem, SlidingPuzzleProblem
+from instrumentation import EventCounter
+from conftest import GOAL
+
+"""the anytime search (strategy 10) ends with an optimal solution when it has the time, and when a budget stops it
+returns its best solution with the status of the budget and a bound that holds with admissible pattern databases"""
+
+HARD = [8, 6, 7, 2, 5, 4, 3, 0, 1]  # 31 moves
+
+
+def test_anytime_search_ends_optimal(databases):
+    counter = EventCounter()
+    result = solve(Eight_PuzzleProblem(HARD, GOAL, databases), 10, listeners=[counter])
+    assert result.status == "solved"
+    assert result.node.path_cost == 31
+    assert result.bound == 1.0
+    assert counter.counts["solution"] >= 1
+
+
+def test_anytime_search_keeps_the_budget_status(databases):
+    for max_nodes in (20, 50, 100, 200):
+        result = solve(Eight_PuzzleProblem(HARD, GOAL, databases), 10, max_nodes=max_nodes, weight=5)
+        if result.node is None:
+            assert result.status == "node limit" and result.bound is None
+            continue
+        assert result.status in ("node limit", "solved")
+        assert result.bound >= 1.0
+        assert result.node.path_cost <= result.bound * 31
+
+
+def test_anytime_search_time_limit():
+    goal = list(range(1, 16)) + [0]
+    result = solve(SlidingPuzzleProblem([0, 15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1], goal), 10,
+                   max_time=0.5)
+    assert result.status == "time limit"
+    assert result.wall_time < 1.5
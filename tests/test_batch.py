@@ -0,0 +1,21 @@
+import batch
+from conftest import GOAL
+
+"""the instances of a batch are solved with the pattern databases built for their goal, and with the default heuristic
+when none of the databases was built for it"""
+
+
+def test_pattern_databases_are_chosen_by_goal(databases):
+    batch.init_worker(databases)
+    try:
+        other_goal = [0, 1, 2, 3, 4, 5, 6, 7, 8]
+        assert not batch.make_problem({"problem": "sliding", "initial": GOAL, "goal": other_goal}).pattern_databases
+        assert len(batch.make_problem({"problem": "sliding", "initial": other_goal, "goal": GOAL}).pattern_databases) == 2
+        record = batch.solve_instance({"problem": "sliding", "initial": [8, 6, 7, 2, 5, 4, 3, 0, 1], "goal": other_goal,
+                                       "strategy": 4})
+        assert record["status"] == "solved"
+        record = batch.solve_instance({"problem": "sliding", "initial": [8, 6, 7, 2, 5, 4, 3, 0, 1], "goal": GOAL,
+                                       "strategy": 4})
+        assert record["status"] == "solved" and record["cost"] == 31
+    finally:
+        batch.init_worker([])
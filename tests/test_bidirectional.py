@@ -0,0 +1,28 @@
+import random
+
+from search import Node, solve
+from problem import Eight_PuzzleProblem
+from conftest import GOAL
+
+"""bidirectional A* (strategy 8) must find optimal paths when the sliding puzzle is given admissible pattern
+databases. The exact distance table (strategy 9) gives the optimal cost to compare with"""
+
+
+def random_instances(count, seed=0):
+    rng = random.Random(seed)
+    problem = Eight_PuzzleProblem(GOAL, GOAL)
+    instances = [[4, 7, 1, 8, 2, 3, 5, 0, 6]]  # bidirectional A* used to find 21 moves instead of 19 here
+    for _ in range(count):
+        node = Node(problem.initial_state)
+        for _ in range(rng.randint(10, 80)):
+            node = rng.choice(problem.successor_function(node))
+        instances.append(problem.decode_state(node.state))
+    return instances
+
+
+def test_bidirectional_astar_is_optimal_with_pattern_databases(databases, table_directory):
+    for initial in random_instances(100):
+        optimal = solve(Eight_PuzzleProblem(initial, GOAL), 9).node.path_cost
+        result = solve(Eight_PuzzleProblem(initial, GOAL, databases), 8)
+        assert result.status == "solved"
+        assert result.node.path_cost == optimal, initial
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from search import solve
+from problem import Eight_PuzzleProblem, SlidingPuzzleProblem, ProblemMissionaries
+from instrumentation import PhaseTimer
+from conftest import GOAL
+
+"""strategy 9 solves the 8-puzzle optimally with the exact distance table and rejects the other problems before
+building a table for them"""
+
+
+def test_distance_table_with_phase_timer(table_directory):
+    timer = PhaseTimer()
+    result = solve(Eight_PuzzleProblem([8, 6, 7, 2, 5, 4, 3, 0, 1], GOAL), 9, listeners=[timer])
+    assert result.status == "solved"
+    assert result.node.path_cost == 31
+    assert timer.report()
+
+
+@pytest.mark.parametrize("problem", [ProblemMissionaries([3, 3, 1], [0, 0, 0]),
+                                     SlidingPuzzleProblem(list(range(1, 16)) + [0], list(range(1, 16)) + [0])])
+def test_distance_table_rejects_other_problems(problem, table_directory):
+    before = set(os.listdir("."))
+    with pytest.raises(ValueError):
+        solve(problem, 9)
+    with pytest.raises(ValueError):
+        solve(problem, 9, listeners=[PhaseTimer()])
+    assert set(os.listdir(".")) == before
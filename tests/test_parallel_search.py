@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from search import Node, solve
+from problem import Eight_PuzzleProblem
+from parallel_search import hda_star
+from conftest import GOAL
+
+"""hash-distributed A* finds optimal solutions with admissible pattern databases whatever the number of workers, the
+optimal costs come from the exact distance table (strategy 9)"""
+
+
+def instances(count, seed=1):
+    rng = random.Random(seed)
+    problem = Eight_PuzzleProblem(GOAL, GOAL)
+    states = [[8, 6, 7, 2, 5, 4, 3, 0, 1]]  # one of the two hardest 8-puzzles, 31 moves
+    for _ in range(count):
+        node = Node(problem.initial_state)
+        for _ in range(rng.randint(20, 80)):
+            node = rng.choice(problem.successor_function(node))
+        states.append(problem.decode_state(node.state))
+    return states
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_hda_star_is_optimal_with_pattern_databases(workers, databases, table_directory):
+    for initial in instances(8):
+        optimal = solve(Eight_PuzzleProblem(initial, GOAL), 9).node.path_cost
+        result = hda_star(Eight_PuzzleProblem(initial, GOAL, databases), workers=workers)
+        assert result.status == "solved"
+        assert result.node.path_cost == optimal, initial
+        assert len(result.workers) == workers
+        path = result.solution()
+        assert path[0].state == Eight_PuzzleProblem(initial, GOAL).initial_state
+        assert path[-1].state == Eight_PuzzleProblem(GOAL, GOAL).initial_state
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+
+from service import SolveService, Worker
+from conftest import GOAL
+
+"""the solve service answered over a local connection: solving and the cache, the requests that are rejected, the
+cancellation of a request (which replaces its worker without blocking the server) and the answer 503 when the queue is
+full"""
+
+EASY = {"problem": "sliding", "initial": [1, 2, 3, 4, 5, 6, 0, 7, 8], "goal": GOAL, "strategy": 4}
+# breadth-first search does not solve this 15-puzzle in any reasonable time, it runs until it is cancelled
+SLOW = {"problem": "sliding", "initial": [0, 15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1],
+        "goal": list(range(1, 16)) + [0], "strategy": 1}
+
+
+async def request(port, method, path, body=None):
+    """sends one HTTP request and returns the status and the JSON of the answer"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(b"%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n" % (method.encode(), path.encode(),
+                                                                                        len(data)) + data)
+    await writer.drain()
+    answer = await reader.read()
+    writer.close()
+    head, _, payload = answer.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def wait_for(condition, timeout=10):
+    limit = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < limit
+        await asyncio.sleep(0.01)
+
+
+def run_service(scenario, **options):
+    """runs scenario(service, port) against a service on a free local port, and waits for all the workers to be idle
+    again before stopping it"""
+    async def main():
+        service = SolveService(**options)
+        service.start()
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        try:
+            await scenario(service, server.sockets[0].getsockname()[1])
+            await wait_for(lambda: service.idle.qsize() == service.workers)
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+    asyncio.run(main())
+
+
+def test_solve_and_cache():
+    async def scenario(service, port):
+        status, record = await request(port, "POST", "/solve", EASY)
+        assert status == 200
+        assert (record["status"], record["cost"], record["moves"], record["cached"]) == ("solved", 2,
+                                                                                          ["right", "right"], False)
+        status, record = await request(port, "POST", "/solve", dict(EASY, id="again"))
+        assert status == 200 and record["cached"] and record["id"] == "again" and record["cost"] == 2
+        status, metrics = await request(port, "GET", "/metrics")
+        assert metrics["cache"]["hits"] == 1 and metrics["cache"]["hit_rate"] == 0.5
+        assert metrics["statuses"]["solved"] == 2 and metrics["latency_ms"]["count"] == 2
+    run_service(scenario, workers=1)
+
+
+def test_bad_requests():
+    async def scenario(service, port):
+        for body in (dict(EASY, timeout="abc"), dict(EASY, timeout=-1), dict(EASY, timeout=True),
+                     dict(EASY, max_time=0), {"problem": "sliding"}, [1, 2]):
+            status, record = await request(port, "POST", "/solve", body)
+            assert status == 400 and "error" in record
+        status, record = await request(port, "POST", "/solve", dict(EASY, strategy=99))
+        assert status == 400 and record["status"] == "error"
+        assert (await request(port, "GET", "/nothing"))[0] == 404
+        assert (await request(port, "DELETE", "/solve/nothing"))[0] == 404
+    run_service(scenario, workers=1)
+
+
+def test_cancel_replaces_the_worker_without_blocking(monkeypatch):
+    stop = Worker.stop
+
+    def slow_stop(worker):  # a process that takes its time to end
+        time.sleep(1)
+        stop(worker)
+    monkeypatch.setattr(Worker, "stop", slow_stop)
+
+    async def scenario(service, port):
+        process = service.idle._queue[0].process
+        solving = asyncio.ensure_future(request(port, "POST", "/solve", dict(SLOW, id="slow")))
+        await wait_for(lambda: "slow" in service.running and service.idle.empty())
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        assert await request(port, "DELETE", "/solve/slow") == (200, {"id": "slow", "status": "cancelled"})
+        assert await solving == (200, {"id": "slow", "status": "cancelled"})
+        assert (await request(port, "GET", "/metrics"))[1]["statuses"]["cancelled"] == 1
+        assert time.perf_counter() - started < 0.5  # the server answered while the worker was being replaced
+        assert service.idle.empty()
+        await wait_for(lambda: service.idle.qsize() == 1)
+        assert not process.is_alive()
+        assert service.idle._queue[0].process is not process
+        status, record = await request(port, "POST", "/solve", EASY)
+        assert status == 200 and record["status"] == "solved"
+    run_service(scenario, workers=1)
+
+
+def test_full_queue_is_rejected():
+    async def scenario(service, port):
+        solving = [asyncio.ensure_future(request(port, "POST", "/solve", dict(SLOW, id="slow%d" % i)))
+                   for i in range(2)]
+        await wait_for(lambda: len(service.running) == 2 and service.pending == 2)
+        status, record = await request(port, "POST", "/solve", dict(SLOW, id="one too many"))
+        assert status == 503 and record["status"] == "rejected"
+        for i in range(2):
+            await request(port, "DELETE", "/solve/slow%d" % i)
+        assert [answer[1]["status"] for answer in await asyncio.gather(*solving)] == ["cancelled", "cancelled"]
+    run_service(scenario, workers=1, queue_size=1)
+
+
+def test_timeout_stops_the_search():
+    async def scenario(service, port):
+        started = time.perf_counter()
+        status, record = await request(port, "POST", "/solve", dict(SLOW, timeout=0.5))
+        assert status == 200 and record["status"] == "time limit"
+        assert time.perf_counter() - started < 3
+        status, record = await request(port, "POST", "/solve", dict(SLOW, timeout=0.5))
+        assert record["cached"] is False  # a search stopped by its budget is not cached
+    run_service(scenario, workers=1)
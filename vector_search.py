@@ -0,0 +1,245 @@
+import time
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed by this module, the rest of the project works without it
+    numpy = None
+
+from search import Node, SearchResult, path_to_node
+from problem import SlidingPuzzleProblem, PegProblem
+
+"""breadth-first search one layer at a time with NumPy, for the problems whose states fit in a 64 bit integer (the
+8-puzzle and the 15-puzzle, peg solitaire boards of up to 64 cells). The nodes of a layer are not Node objects but one
+array of packed states, and each move is applied to the whole layer at once with a few array operations. The children
+are sorted and the duplicates removed with numpy.unique, then the states that are already in the layers that a child
+can be in (see lookback) are removed with a binary search (numpy.searchsorted) in these sorted layers.
+For each state we only keep the index of its parent in the previous layer (4 bytes) and the action that led to it (1
+byte), which is enough to rebuild the path to the goal at the end. The whole 8-puzzle (181440 states) takes a few
+megabytes and about a second.
+The moves of each problem are written for arrays in a class of this module (SlidingPuzzleLayers, PegSolitaireLayers)
+built from the tables the problem class already has"""
+
+UINT64 = numpy.uint64 if numpy is not None else None
+
+
+def popcount(values):
+    """returns the number of bits set in each value of an array of uint64"""
+    if hasattr(numpy, "bitwise_count"):
+        return numpy.bitwise_count(values)
+    values = values - ((values >> UINT64(1)) & UINT64(0x5555555555555555))
+    values = (values & UINT64(0x3333333333333333)) + ((values >> UINT64(2)) & UINT64(0x3333333333333333))
+    values = (values + (values >> UINT64(4))) & UINT64(0x0F0F0F0F0F0F0F0F)
+    return (values * UINT64(0x0101010101010101)) >> UINT64(56)
+
+
+class SlidingPuzzleLayers:
+    """the moves of a SlidingPuzzleProblem on arrays. The packed state of the problem keeps the position of the blank
+    above the tiles, which does not fit in 64 bits for the 15-puzzle, so the arrays only keep the tiles and the blank is
+    found again from them (it is the cell whose tile is 0)"""
+    lookback = 2  # a move can be undone, so a child is new or in the layer of its parent or the one before
+
+    def __init__(self, problem):
+        if problem.bits * problem.cells > 64:
+            raise ValueError("the states of this puzzle do not fit in 64 bits")
+        self.problem = problem
+        self.tiles_mask = (1 << problem.bits * problem.cells) - 1
+
+    def pack(self, state):
+        return state & self.tiles_mask
+
+    def unpack(self, value):
+        value = int(value)
+        problem = self.problem
+        for cell in range(problem.cells):
+            if not value >> problem.bits * cell & problem.tile_mask:
+                return value | cell << problem.blank_shift
+
+    def keys(self, states):
+        return states
+
+    def expand(self, layer):
+        """returns the children of all the states of the layer, the index of the parent of each one in the layer and its
+        action. The states are grouped by the position of their blank, which gives the moves they can make"""
+        problem = self.problem
+        bits, tile_mask = UINT64(problem.bits), UINT64(problem.tile_mask)
+        blank = numpy.zeros(len(layer), dtype=numpy.uint8)
+        for cell in range(problem.cells):
+            blank[(layer >> UINT64(problem.bits * cell) & tile_mask) == 0] = cell
+        children, parents, actions = list(), list(), list()
+        for cell in range(problem.cells):
+            index = numpy.flatnonzero(blank == cell)
+            if not len(index):
+                continue
+            states = layer[index]
+            for shift, multiplier, blank_change, action in problem.neighbours[cell]:
+                tiles = states >> UINT64(shift) & tile_mask
+                if multiplier >= 0:
+                    children.append(states + tiles * UINT64(multiplier))
+                else:
+                    children.append(states - tiles * UINT64(-multiplier))
+                parents.append(index)
+                actions.append(numpy.full(len(index), action, dtype=numpy.uint8))
+        return numpy.concatenate(children), numpy.concatenate(parents), numpy.concatenate(actions)
+
+    def alive(self, children, pruned):
+        return None
+
+
+class PegSolitaireLayers:
+    """the moves of a PegProblem on arrays: each jump is tested on the whole layer with two masks. The boards that are
+    symmetric are kept once, under the key of PegProblem.state_key, which is computed with the same lookup tables
+    indexed by arrays. The dead ends of PegProblem.is_dead_end are pruned"""
+    lookback = 0  # every jump removes a peg, so a child can never be in an earlier layer
+
+    def __init__(self, problem):
+        if problem.cells > 64:
+            raise ValueError("the boards of more than 64 cells do not fit in 64 bits")
+        self.problem = problem
+        width = problem.width
+        self.jumps = list()  # (cells that need a peg, cell that needs to be empty, cells that change, action)
+        for action, (row, col, over_row, over_col) in enumerate(problem.jump_actions):
+            start, over = width * row + col, width * over_row + over_col
+            land = 2 * over - start
+            self.jumps.append((UINT64(1 << start | 1 << over), UINT64(1 << land),
+                               UINT64(1 << start | 1 << over | 1 << land), action))
+        self.symmetries = [[numpy.array(table, dtype=numpy.uint64) for table in tables]
+                           for tables, actions in problem.symmetries]
+        self.goal = UINT64(problem.goal)
+        self.resources = [(UINT64(mask), needed) for mask, needed in problem.resources]
+
+    def pack(self, state):
+        return state
+
+    def unpack(self, value):
+        return int(value)
+
+    def keys(self, states):
+        """the smallest image of each board by the symmetries (see PegProblem.state_key)"""
+        if not self.symmetries:
+            return states
+        chunk, mask = UINT64(self.problem.chunk), UINT64(self.problem.chunk_mask)
+        rows = [(states >> UINT64(i) * chunk & mask).astype(numpy.intp) for i in range(7)]
+        keys = states.copy()
+        for tables in self.symmetries:
+            image = tables[0][rows[0]]
+            for i in range(1, 7):
+                image |= tables[i][rows[i]]
+            numpy.minimum(keys, image, out=keys)
+        return keys
+
+    def expand(self, layer):
+        children, parents, actions = list(), list(), list()
+        for pegs, land, flip, action in self.jumps:
+            index = numpy.flatnonzero(((layer & pegs) == pegs) & ((layer & land) == 0))
+            if len(index):
+                children.append(layer[index] ^ flip)
+                parents.append(index)
+                actions.append(numpy.full(len(index), action, dtype=numpy.uint8))
+        if not children:
+            return numpy.zeros(0, dtype=numpy.uint64), numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, numpy.uint8)
+        return numpy.concatenate(children), numpy.concatenate(parents), numpy.concatenate(actions)
+
+    def alive(self, children, pruned):
+        """returns the mask of the children that are not dead ends and counts the others in pruned by rule"""
+        dead = (popcount(children) <= self.problem.goal_pegs) & (children != self.goal)
+        if dead.any():
+            pruned["peg count"] = pruned.get("peg count", 0) + int(dead.sum())
+        alive = ~dead
+        for mask, needed in self.resources:
+            dead = alive & (popcount(children & mask) < needed)
+            if dead.any():
+                pruned["resource count"] = pruned.get("resource count", 0) + int(dead.sum())
+                alive &= ~dead
+        return alive
+
+
+def layer_moves(problem):
+    """returns the object that applies the moves of the problem to arrays"""
+    if isinstance(problem, SlidingPuzzleProblem):
+        return SlidingPuzzleLayers(problem)
+    if isinstance(problem, PegProblem):
+        return PegSolitaireLayers(problem)
+    raise ValueError("there is no vectorized search for %s" % type(problem).__name__)
+
+
+class LayeredSearchResult(SearchResult):
+    """the SearchResult of vector_bfs, layers has the number of states at each depth"""
+    def __init__(self, node, status, expanded, loops, pruned, peak_frontier, wall_time, layers):
+        super().__init__(node, status, expanded, loops, pruned, peak_frontier, wall_time)
+        self.layers = layers
+
+
+def vector_bfs(problem, max_time=None, max_stored_nodes=None, stop_at_goal=True):
+    """breadth-first search of the problem one layer at a time, returns a LayeredSearchResult whose node is the goal
+    node (with its parents up to the initial state) at the smallest depth. With stop_at_goal False the search goes on
+    until every state that can be reached has been found, which enumerates the state space (see result.layers).
+    The budgets are the ones of search.SearchEngine, they are checked before each layer"""
+    if numpy is None:
+        raise ImportError("the vectorized search needs numpy (pip install numpy)")
+    start = time.perf_counter()
+    moves = layer_moves(problem)
+    if not problem.is_solvable():
+        return LayeredSearchResult(None, "unsolvable", 0, 0, dict(), 0, time.perf_counter() - start, list())
+    layers = [moves.keys(numpy.array([moves.pack(problem.initial_state)], dtype=numpy.uint64))]
+    parents, actions = [None], [None]
+    goal = moves.keys(numpy.array([moves.pack(problem.goal)], dtype=numpy.uint64))[0]
+    found = (0, 0) if layers[0][0] == goal else None
+    expanded, loops, stored, pruned, status = 0, 0, 1, dict(), None
+    while len(layers[-1]) and not (found and stop_at_goal):
+        if max_time is not None and time.perf_counter() - start >= max_time:
+            status = "time limit"
+            break
+        if max_stored_nodes is not None and stored >= max_stored_nodes:
+            status = "memory limit"
+            break
+        layer = layers[-1]
+        children, parent_index, action = moves.expand(layer)
+        expanded += len(layer)
+        alive = moves.alive(children, pruned)
+        if alive is not None:
+            children, parent_index, action = children[alive], parent_index[alive], action[alive]
+        keys, first = numpy.unique(moves.keys(children), return_index=True)
+        new = numpy.ones(len(keys), dtype=bool)
+        for previous in layers[-moves.lookback:] if moves.lookback else ():
+            position = numpy.minimum(numpy.searchsorted(previous, keys), len(previous) - 1)
+            new &= previous[position] != keys
+        loops += len(children) - int(new.sum())
+        layers.append(keys[new])
+        parents.append(parent_index[first[new]].astype(numpy.uint32))
+        actions.append(action[first[new]])
+        stored += len(layers[-1])
+        if found is None:
+            position = int(numpy.searchsorted(layers[-1], goal))
+            if position < len(layers[-1]) and layers[-1][position] == goal:
+                found = (len(layers) - 1, position)
+    if not len(layers[-1]):
+        layers.pop()
+    node = None
+    if found is not None:
+        node = rebuild_path(problem, moves, layers, parents, actions, found[0], found[1])
+        status = "solved"
+    elif status is None:
+        status = "no solution"
+    return LayeredSearchResult(node, status, expanded, loops, pruned, max(len(layer) for layer in layers),
+                               time.perf_counter() - start, [len(layer) for layer in layers])
+
+
+def rebuild_path(problem, moves, layers, parents, actions, depth, index):
+    """returns the goal node at the given index of the layer at the given depth, following the parent indices back to
+    the initial state. The layers keep the keys of the states, when the child that the action makes from the parent is
+    only symmetric to the state on the path, the path before it is mapped onto the orientation of the path"""
+    steps = list()  # (state, action) from the goal back to the initial state, the action leads to the state
+    target = moves.unpack(layers[depth][index])
+    while depth > 0:
+        parent_index = int(parents[depth][index])
+        parent = moves.unpack(layers[depth - 1][parent_index])
+        action = int(actions[depth][index])
+        child = [node.state for node in problem.successor_function(Node(parent)) if node.action == action][0]
+        mapping = problem.map_path_state(child, target)
+        if mapping is not None:
+            parent, action = mapping(parent, action)
+        steps.append((target, action))
+        target, index, depth = parent, parent_index, depth - 1
+    steps.append((target, None))
+    steps.reverse()
+    return path_to_node(steps, problem)